@@ -1,13 +1,95 @@
+import asyncio
+import atexit
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+from backend.services.history_service import log_interactions_bulk
+
+_UTC = timezone.utc
+
+# Longer queries are cut before they reach any prompt
+MAX_QUERY_CHARS = 2000
+
+# Output rules for self_formatted agents: the same final structure
+# FormatterAgent produces, since their answer may be returned as-is
+SELF_FORMATTED_OUTPUT = (
+    "OUTPUT: Markdown for the farmer. Start directly with the answer, no preamble. "
+    "Use this structure: '# **Short clear title**', then '**Summary**: 1-2 sentences', "
+    "then '### Analysis' and '### Recommendations' with bullet points."
+)
+
+# Agent records are written by a background thread, off the request path
+LOG_BATCH_SIZE = 64
+LOG_FLUSH_INTERVAL_SECONDS = 0.5
+LOG_QUEUE_MAX = 10000
+MAX_LOGGED_RESPONSE_CHARS = 5000
+_LOG_QUEUE: "queue.Queue[dict]" = queue.Queue(maxsize=LOG_QUEUE_MAX)
+_LOG_STOP = threading.Event()
+
+
+def _drain_log_batch(first: dict, linger: float = 0.0) -> None:
+    # Wait up to linger seconds for more records so a burst is one write
+    deadline = time.monotonic() + linger
+    batch = [first]
+    while len(batch) < LOG_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        try:
+            if remaining > 0:
+                batch.append(_LOG_QUEUE.get(timeout=remaining))
+            else:
+                batch.append(_LOG_QUEUE.get_nowait())
+        except queue.Empty:
+            break
+
+    try:
+        log_interactions_bulk(batch)
+    except Exception:
+        pass
+
+
+def _log_writer() -> None:
+    while not _LOG_STOP.is_set():
+        try:
+            first = _LOG_QUEUE.get(timeout=LOG_FLUSH_INTERVAL_SECONDS)
+        except queue.Empty:
+            continue
+        _drain_log_batch(first, linger=LOG_FLUSH_INTERVAL_SECONDS)
+
 
-from backend.services.history_service import log_interaction
+def _flush_log_queue() -> None:
+    # Let the writer finish the batch it holds before draining the rest
+    _LOG_STOP.set()
+    _LOG_WRITER.join(timeout=LOG_FLUSH_INTERVAL_SECONDS * 2)
+
+    while True:
+        try:
+            first = _LOG_QUEUE.get_nowait()
+        except queue.Empty:
+            return
+        _drain_log_batch(first)
+
+
+_LOG_WRITER = threading.Thread(target=_log_writer, name="agri-log-writer", daemon=True)
+_LOG_WRITER.start()
+atexit.register(_flush_log_queue)
 
 
 class AgriAgentBase(ABC):
+    # Agents are stateless shared instances; no per-instance __dict__
+    __slots__ = ()
+
     name: str = "AgriAgentBase"
 
+    # True when the agent's own output is farmer-ready without FormatterAgent
+    self_formatted: bool = False
+
+    # True when context-free answers may be reused for near-identical questions
+    semantic_cache: bool = False
+
     @abstractmethod
     def handle_query(
         self,
@@ -17,22 +99,52 @@ class AgriAgentBase(ABC):
     ) -> str:
         pass
 
+    async def ahandle_query(
+        self,
+        query: Optional[str] = None,
+        image_path: Optional[str] = None,
+        chat_history: Optional[str] = None,
+    ) -> str:
+        """
+        Async entrypoint used by the master agent fan-out.
+        Runs the blocking handler in a worker thread so several agents
+        can wait on Groq concurrently.
+        """
+        return await asyncio.to_thread(
+            self.handle_query, query, image_path, chat_history
+        )
+
+    def build_prompt(
+        self,
+        query: str,
+        chat_history: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Return the text prompt for a cleaned query so the master agent can
+        batch several agents into one Groq submission.
+        Agents that cannot be batched return None.
+        """
+        return None
 
     @staticmethod
     def _normalize_query(q: Optional[str]) -> str:
-        if q is None:
+        if not isinstance(q, str):
             return ""
-        return q.strip()
+        q = q.strip()
+        return q if len(q) <= MAX_QUERY_CHARS else q[:MAX_QUERY_CHARS]
 
     @staticmethod
-    def _detect_query_type(query, image_path):
+    def _detect_query_type(query, image_path, has_image: bool = False) -> Tuple[str, str]:
+        """Return (query_type, normalized_query) so callers don't strip again."""
         normalized_query = AgriAgentBase._normalize_query(query)
+        # Uploads handled in memory have no path but are still images
+        has_image = has_image or bool(image_path)
 
-        if normalized_query and image_path:
-            return "multimodal"
-        if image_path:
-            return "image"
-        return "text"
+        if normalized_query and has_image:
+            return "multimodal", normalized_query
+        if has_image:
+            return "image", normalized_query
+        return "text", normalized_query
 
     def record(
         self,
@@ -45,10 +157,14 @@ class AgriAgentBase(ABC):
         safe_response = str(response)
 
         entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(_UTC).isoformat(timespec="seconds"),
             "agent": self.name,
             "query": query or "",
-            "response": safe_response[:5000],
+            "response": (
+                safe_response
+                if len(safe_response) <= MAX_LOGGED_RESPONSE_CHARS
+                else safe_response[:MAX_LOGGED_RESPONSE_CHARS]
+            ),
             "type": query_type,
         }
 
@@ -59,8 +175,8 @@ class AgriAgentBase(ABC):
             entry["meta"] = meta
 
         try:
-            log_interaction(entry)
-        except Exception:
+            _LOG_QUEUE.put_nowait(entry)
+        except queue.Full:
             pass  
 
 
@@ -70,8 +186,9 @@ class AgriAgentBase(ABC):
         response,
         image_path=None,
         meta: Optional[dict] = None,  
+        has_image: bool = False,
     ):
-        query_type = self._detect_query_type(query, image_path)
+        query_type, _ = self._detect_query_type(query, image_path, has_image)
         safe_response = str(response)
 
         self.record(
@@ -1,5 +1,28 @@
 from backend.services.text_service import query_groq_text
-from backend.agents.agri_agent_base import AgriAgentBase
+from backend.agents.agri_agent_base import SELF_FORMATTED_OUTPUT, AgriAgentBase
+
+
+# Crop-specific prompt
+_PROMPT_TEMPLATE = " ".join([
+    "You are AgriGPT CropAgent.",
+    "ROLE: You are a crop management specialist.",
+    "You provide guidance ONLY on crop cultivation practices, fertilizer planning (general or conditional), soil preparation, and crop growth stage care.",
+    "STRICT BOUNDARIES: Do NOT diagnose pests or diseases. Do NOT identify insects or leaf damage. Do NOT analyze images.",
+    "Do NOT give subsidy or loan information. Do NOT give irrigation schedules. Do NOT override other expert agents.",
+    "SAFETY RULES: Do NOT guess soil type, crop variety, or region unless stated.",
+    "Use conditional language when required. If essential details are missing, say so clearly.",
+    "Do NOT invent chemical names or dosages.",
+    "PREVIOUS CONTEXT: {chat_history}",
+    "FARMER QUERY: {query}",
+    "RESPONSE INSTRUCTIONS:",
+    "Give practical, actionable crop management advice.",
+    "Use simple, farmer-friendly language.",
+    "If fertilizer is mentioned, provide type (example: NPK, urea, compost) and a general dosage range or conditional guidance when exact dosage is unknown.",
+    "Mention soil preparation steps if relevant.",
+    "Focus ONLY on crop practices. Avoid repetition and theory.",
+    SELF_FORMATTED_OUTPUT,
+])
+
 
 class CropAgent(AgriAgentBase):
     """
@@ -8,11 +31,16 @@ class CropAgent(AgriAgentBase):
     DOES NOT diagnose pests, diseases, or irrigation failures.
     """
 
+    __slots__ = ()
+
     name = "CropAgent"
+    self_formatted = True
 
     def handle_query(self, query: str = None, image_path: str = None, chat_history: str = None) -> str:
 
-        if not query or not query.strip():
+        clean_query = self._normalize_query(query)
+
+        if not clean_query:
             response = (
                 "Please ask a crop management question.\n"
                 "Examples:\n"
@@ -22,28 +50,7 @@ class CropAgent(AgriAgentBase):
             )
             return self.respond_and_record("", response, image_path)
 
-        clean_query = query.strip()
-
-        # Crop-specific prompt
-        prompt = " ".join([
-            "You are AgriGPT CropAgent.",
-            "ROLE: You are a crop management specialist.",
-            "You provide guidance ONLY on crop cultivation practices, fertilizer planning (general or conditional), soil preparation, and crop growth stage care.",
-            "STRICT BOUNDARIES: Do NOT diagnose pests or diseases. Do NOT identify insects or leaf damage. Do NOT analyze images.",
-            "Do NOT give subsidy or loan information. Do NOT give irrigation schedules. Do NOT override other expert agents.",
-            "SAFETY RULES: Do NOT guess soil type, crop variety, or region unless stated.",
-            "Use conditional language when required. If essential details are missing, say so clearly.",
-            "Do NOT invent chemical names or dosages.",
-            f"PREVIOUS CONTEXT: {chat_history if chat_history else 'None'}",
-            f"FARMER QUERY: {clean_query}",
-            "RESPONSE INSTRUCTIONS:",
-            "Give practical, actionable crop management advice.",
-            "Use simple, farmer-friendly language.",
-            "If fertilizer is mentioned, provide type (example: NPK, urea, compost) and a general dosage range or conditional guidance when exact dosage is unknown.",
-            "Mention soil preparation steps if relevant.",
-            "Focus ONLY on crop practices. Avoid repetition and theory.",
-            "OUTPUT: Plain advisory text only. No formatting, no titles, no forced bullets."
-        ])
+        prompt = self.build_prompt(clean_query, chat_history)
 
         # LLM call
         try:
@@ -56,3 +63,10 @@ class CropAgent(AgriAgentBase):
             response=resp,
             image_path=image_path
         )
+
+    def build_prompt(self, query: str, chat_history: str = None) -> str:
+
+        return _PROMPT_TEMPLATE.format(
+            chat_history=chat_history if chat_history else 'None',
+            query=query,
+        )
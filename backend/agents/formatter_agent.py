@@ -1,7 +1,77 @@
-from typing import Any, Dict, List
-from backend.services.text_service import query_groq_text
+import io
+from typing import Any, Dict, List, Tuple, Union
+from backend.services.text_service import aquery_groq_text, query_groq_text
 from backend.agents.agri_agent_base import AgriAgentBase
 
+# Agent outputs (vision especially) can ramble; cap each before merging
+MAX_AGENT_OUTPUT_CHARS = 3000
+
+# One labelled agent output inside the formatter prompt
+_BLOCK_TEMPLATE = "[{role} | {agent}]\n{content}"
+
+_PROMPT_HEAD = """
+SYSTEM ROLE:
+You are AgriGPT FormatterAgent.
+
+You are the FINAL OUTPUT LAYER.
+Your goal is to provide a CLEAR, COMPREHENSIVE, and FRIENDLY response to the farmer.
+
+==================================================
+INPUT CONTEXT
+==================================================
+User Query: \""""
+
+_PROMPT_MID_WITH_IMAGE = '"\nHas Image: Yes\n\nExpert Agent Responses:\n'
+_PROMPT_MID_NO_IMAGE = '"\nHas Image: No\n\nExpert Agent Responses:\n'
+
+_PROMPT_TAIL = """
+
+==================================================
+INSTRUCTIONS
+==================================================
+
+1. **SYNTHESIZE (Direct & Punchy)**:
+   - **SKIP THE PREAMBLE**. Do not say "We understand...", "Based on the analysis...", or "The user is asking...".
+   - Start IMMEDIATELY with the answer or summary.
+   - If multiple agents responded, weave insights together.
+   - Start with a direct answer to the user's core question.
+   - If there is an image diagnosis, mention it early ("Based on the image, we see...").
+
+2. **TONE**:
+   - Professional, encouraging, and easy to understand.
+   - Use "We" or "I" to sound like a helpful assistant.
+
+3. **FORMATTING (Markdown Allowed)**:
+   - Use **Bold** for emphasis and headings. 
+   - Use `### Headers` to separate sections (e.g., "Diagnosis", "Treatment", "Prevention").
+   - Use bullet points for lists.
+   - Use **Bold** for the title of the response.
+
+4. **SAFETY**:
+   - Do not invent new chemical advice not present in the expert text.
+   - If experts disagree, mention the uncertainty.
+
+==================================================
+FINAL OUTPUT STRUCTURE
+==================================================
+
+# **Title (Clear & Short)**
+
+**Summary**: [1-2 sentences summarizing the situation]
+
+### Analysis
+[Detailed synthesis of what was found]
+
+### Recommendations
+[Actionable steps from the agents]
+
+"""
+
+
+def _use_cache(meta: Dict[str, Any]) -> bool:
+    # Freshly combined multimodal text rarely repeats, so don't cache it
+    return not (meta and meta.get("routing_mode") == "multimodal")
+
 
 class FormatterAgent(AgriAgentBase):
     """
@@ -14,11 +84,56 @@ class FormatterAgent(AgriAgentBase):
     - LLM used strictly for formatting
     """
 
+    __slots__ = ()
+
     name = "FormatterAgent"
 
 
     def handle_query(self, payload: Any, image_path: str = None, chat_history: str = None) -> str:
 
+        job = self._prepare(payload, image_path)
+        if isinstance(job, str):
+            return job
+
+        user_query, prompt, ordered_blocks, meta = job
+
+        try:
+            formatted = query_groq_text(prompt, use_cache=_use_cache(meta))
+        except Exception:
+            formatted = "\n\n".join(ordered_blocks)
+
+        return self._finish(user_query, formatted, image_path, meta)
+
+    async def ahandle_query(self, payload: Any, image_path: str = None, chat_history: str = None) -> str:
+        """
+        Async variant of handle_query; the Groq call and its retry
+        backoff run on the event loop instead of a worker thread.
+        """
+
+        job = self._prepare(payload, image_path)
+        if isinstance(job, str):
+            return job
+
+        user_query, prompt, ordered_blocks, meta = job
+
+        try:
+            formatted = await aquery_groq_text(prompt, use_cache=_use_cache(meta))
+        except Exception:
+            formatted = "\n\n".join(ordered_blocks)
+
+        return self._finish(user_query, formatted, image_path, meta)
+
+    def _prepare(
+        self,
+        payload: Any,
+        image_path: str = None,
+    ) -> Union[str, Tuple[str, str, List[str], Dict[str, Any]]]:
+        """
+        Return either a final response, when there is nothing to format,
+        or (user_query, prompt, ordered_blocks, meta) for the formatting call.
+        The blocks are joined as a fallback only if that call fails.
+        """
+
         if isinstance(payload, str):
             clean_text = payload.strip()
             if not clean_text:
@@ -26,7 +141,7 @@ class FormatterAgent(AgriAgentBase):
                     "", "No content available to format.", image_path
                 )
 
-            return self._format_text(
+            return self._build_job(
                 user_query="",
                 ordered_blocks=[clean_text],
                 image_path=image_path,
@@ -36,7 +151,7 @@ class FormatterAgent(AgriAgentBase):
         if not isinstance(payload, dict):
             return self.respond_and_record("", str(payload), image_path)
 
-        user_query: str = str(payload.get("user_query", "")).strip()
+        user_query: str = self._normalize_query(str(payload.get("user_query", "")))
         agent_results: List[Dict[str, str]] = payload.get("agent_results", [])
         routing_mode: str = str(payload.get("routing_mode", "unknown"))
 
@@ -65,10 +180,14 @@ class FormatterAgent(AgriAgentBase):
             role = str(item.get("role", "supporting")).lower()
             agent = str(item.get("agent", "UnknownAgent"))
             content = str(item.get("content", "")).strip()
+            if len(content) > MAX_AGENT_OUTPUT_CHARS:
+                content = content[:MAX_AGENT_OUTPUT_CHARS]
 
             if content:
                 ordered_blocks.append(
-                    f"[{role.upper()} | {agent}]\n{content}"
+                    _BLOCK_TEMPLATE.format(
+                        role=role.upper(), agent=agent, content=content
+                    )
                 )
                 role_log.append({
                     "agent": agent,
@@ -86,84 +205,44 @@ class FormatterAgent(AgriAgentBase):
             "agent_count": len(role_log),
         }
 
-        return self._format_text(
+        return self._build_job(
             user_query=user_query,
             ordered_blocks=ordered_blocks,
             image_path=image_path,
             meta=meta,
         )
 
-    def _format_text(
+    def _build_job(
         self,
         user_query: str,
         ordered_blocks: List[str],
         image_path: str = None,
         meta: Dict[str, Any] = None,
-    ) -> str:
+    ) -> Tuple[str, str, List[str], Dict[str, Any]]:
 
-        combined_content = "\n\n".join(ordered_blocks)
+        # Write blocks straight into the prompt buffer instead of joining
+        # them first and copying the joined text into the prompt again
+        buf = io.StringIO()
+        buf.write(_PROMPT_HEAD)
+        buf.write(user_query)
+        buf.write(_PROMPT_MID_WITH_IMAGE if image_path else _PROMPT_MID_NO_IMAGE)
 
-        prompt = f"""
-SYSTEM ROLE:
-You are AgriGPT FormatterAgent.
-
-You are the FINAL OUTPUT LAYER.
-Your goal is to provide a CLEAR, COMPREHENSIVE, and FRIENDLY response to the farmer.
+        for i, block in enumerate(ordered_blocks):
+            if i:
+                buf.write("\n\n")
+            buf.write(block)
 
-==================================================
-INPUT CONTEXT
-==================================================
-User Query: "{user_query}"
-Has Image: {"Yes" if image_path else "No"}
+        buf.write(_PROMPT_TAIL)
 
-Expert Agent Responses:
-{combined_content}
+        return user_query, buf.getvalue(), ordered_blocks, meta
 
-==================================================
-INSTRUCTIONS
-==================================================
-
-1. **SYNTHESIZE (Direct & Punchy)**:
-   - **SKIP THE PREAMBLE**. Do not say "We understand...", "Based on the analysis...", or "The user is asking...".
-   - Start IMMEDIATELY with the answer or summary.
-   - If multiple agents responded, weave insights together.
-   - Start with a direct answer to the user's core question.
-   - If there is an image diagnosis, mention it early ("Based on the image, we see...").
-
-2. **TONE**:
-   - Professional, encouraging, and easy to understand.
-   - Use "We" or "I" to sound like a helpful assistant.
-
-3. **FORMATTING (Markdown Allowed)**:
-   - Use **Bold** for emphasis and headings. 
-   - Use `### Headers` to separate sections (e.g., "Diagnosis", "Treatment", "Prevention").
-   - Use bullet points for lists.
-   - Use **Bold** for the title of the response.
-
-4. **SAFETY**:
-   - Do not invent new chemical advice not present in the expert text.
-   - If experts disagree, mention the uncertainty.
-
-==================================================
-FINAL OUTPUT STRUCTURE
-==================================================
-
-# **Title (Clear & Short)**
-
-**Summary**: [1-2 sentences summarizing the situation]
-
-### Analysis
-[Detailed synthesis of what was found]
-
-### Recommendations
-[Actionable steps from the agents]
-
-"""
-
-        try:
-            formatted = query_groq_text(prompt)
-        except Exception:
-            formatted = combined_content
+    def _finish(
+        self,
+        user_query: str,
+        formatted: Any,
+        image_path: str = None,
+        meta: Dict[str, Any] = None,
+    ) -> str:
 
         formatted = str(formatted).strip()
 
@@ -1,5 +1,41 @@
 from backend.services.text_service import query_groq_text
-from backend.agents.agri_agent_base import AgriAgentBase
+from backend.agents.agri_agent_base import SELF_FORMATTED_OUTPUT, AgriAgentBase
+
+
+# Irrigation prompt
+_PROMPT_TEMPLATE = " ".join([
+    "You are AgriGPT IrrigationAgent.",
+    "ROLE: You are an irrigation and water management specialist.",
+
+    "YOU HANDLE ONLY irrigation frequency (stage-based or conditional), soil moisture management,",
+    "and drip, sprinkler, and flood irrigation practices, including water-saving methods.",
+
+    "STRICT BOUNDARIES:",
+    "Do NOT diagnose pests, diseases, or nutrient deficiencies.",
+    "Do NOT analyze images.",
+    "Do NOT calculate or optimize yield.",
+    "Do NOT recommend chemicals or fertilizers.",
+    "Do NOT give subsidy or government scheme advice.",
+
+    "SAFETY RULES:",
+    "Do NOT guess soil type or crop stage unless the farmer explicitly states it.",
+    "Use conditional guidance such as 'if sandy soil' or 'if high temperature'.",
+    "If essential details are missing, say so clearly.",
+    "Avoid exact schedules when conditions are unknown.",
+
+    "PREVIOUS CONTEXT: {chat_history}",
+    "FARMER QUERY: {query}",
+
+    "RESPONSE INSTRUCTIONS:",
+    "Give clear and practical irrigation advice.",
+    "Explain when to water and when NOT to water.",
+    "Mention visible signs of overwatering and underwatering only.",
+    "Suggest water-saving practices where relevant.",
+    "Keep language farmer-friendly and easy to follow.",
+    "Avoid repetition and theory.",
+
+    SELF_FORMATTED_OUTPUT,
+])
 
 
 class IrrigationAgent(AgriAgentBase):
@@ -8,11 +44,16 @@ class IrrigationAgent(AgriAgentBase):
     Handles irrigation and water management questions ONLY.
     """
 
+    __slots__ = ()
+
     name = "IrrigationAgent"
+    self_formatted = True
 
     def handle_query(self, query: str = None, image_path: str = None, chat_history: str = None) -> str:
 
-        if not query or not isinstance(query, str) or not query.strip():
+        clean_query = self._normalize_query(query)
+
+        if not clean_query:
             response = (
                 "Please ask an irrigation-related question.\n"
                 "Examples:\n"
@@ -22,44 +63,7 @@ class IrrigationAgent(AgriAgentBase):
             )
             return self.respond_and_record("", response, image_path)
 
-        clean_query = query.strip()
-
-        # Irrigation prompt 
-        prompt = " ".join([
-            "You are AgriGPT IrrigationAgent.",
-            "ROLE: You are an irrigation and water management specialist.",
-
-            "YOU HANDLE ONLY irrigation frequency (stage-based or conditional), soil moisture management,",
-            "and drip, sprinkler, and flood irrigation practices, including water-saving methods.",
-
-            "STRICT BOUNDARIES:",
-            "Do NOT diagnose pests, diseases, or nutrient deficiencies.",
-            "Do NOT analyze images.",
-            "Do NOT calculate or optimize yield.",
-            "Do NOT recommend chemicals or fertilizers.",
-            "Do NOT give subsidy or government scheme advice.",
-
-            "SAFETY RULES:",
-            "Do NOT guess soil type or crop stage unless the farmer explicitly states it.",
-            "Use conditional guidance such as 'if sandy soil' or 'if high temperature'.",
-            "If essential details are missing, say so clearly.",
-            "Avoid exact schedules when conditions are unknown.",
-
-            f"PREVIOUS CONTEXT: {chat_history if chat_history else 'None'}",
-            f"FARMER QUERY: {clean_query}",
-
-            "RESPONSE INSTRUCTIONS:",
-            "Give clear and practical irrigation advice.",
-            "Explain when to water and when NOT to water.",
-            "Mention visible signs of overwatering and underwatering only.",
-            "Suggest water-saving practices where relevant.",
-            "Keep language farmer-friendly and easy to follow.",
-            "Avoid repetition and theory.",
-
-            "OUTPUT:",
-            "Plain advisory text only.",
-            "No formatting, no titles, no forced bullets."
-        ])
+        prompt = self.build_prompt(clean_query, chat_history)
 
         # LLM call
         try:
@@ -72,3 +76,10 @@ class IrrigationAgent(AgriAgentBase):
             response=resp,
             image_path=image_path,
         )
+
+    def build_prompt(self, query: str, chat_history: str = None) -> str:
+
+        return _PROMPT_TEMPLATE.format(
+            chat_history=chat_history if chat_history else 'None',
+            query=query,
+        )
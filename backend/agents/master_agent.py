@@ -1,28 +1,121 @@
 from __future__ import annotations
 from typing import Optional, Dict, Any, List
-import json
+import asyncio
+import copy
 import re
 
+import orjson
+
 from backend.core.langchain_tools import (
     get_agent_registry,
     NON_ROUTABLE_AGENTS,
     AGENT_DESCRIPTIONS,
 )
 from backend.core.llm_client import get_llm
+from backend.services.llm_cache import LLMCache
+from backend.core.response_cache import aembed_query, get_response_cache
+from backend.services.text_service import (
+    aquery_groq_text_batch,
+    EMPTY_RESPONSE_MSG,
+    UNAVAILABLE_MSG,
+)
 from backend.core.memory_manager import get_chat_history, add_message_to_history, format_history_for_prompt
+from backend.agents.agri_agent_base import MAX_QUERY_CHARS
 
-MAX_QUERY_CHARS = 2000
 MAX_ROUTED_AGENTS = 3
 
 PRIMARY_SCORE_THRESHOLD = 75  
 SECONDARY_SCORE_THRESHOLD = 50  
 
+_ROUTER_PROMPT_TEMPLATE = """
+You are an agricultural AI intent router.
+
+TASK:
+Analyze the farmer's query and assign a RELEVANCE SCORE (0-100) to EACH available agent.
+
+AVAILABLE AGENTS:
+{agent_map}
+
+PREVIOUS CONVERSATION:
+{chat_history}
+
+RULES:
+1. **Context Awareness**: If the user says "it", "that", or refers to a previous topic, use the HISTORY to infer the crop or issue.
+2. **Score 0-100**: How well does the agent fit the query?
+   - 90-100: Perfect match (Dominant Intent)
+   - 70-89: Strong match
+   - 50-69: Weak/Partial match
+   - <50: Irrelevant
+3. **Dominant Intent**: Identify the single most relevant agent.
+4. **Multi-Intent**: Only include other agents if they truly cover a DISTINCT part of the query (score > 50).
+5. **CropAgent Fallback**: If specific intent is unclear, CropAgent might have a moderate score, but prefer specific agents (Pest, Subsidy, etc.) if symptoms match.
+6. **Output JSON ONLY**: Return a list of objects.
+
+FARMER QUERY:
+"{query}"
+
+OUTPUT FORMAT (JSON Array):
+[
+  {{ "agent": "AgentName", "score": 95, "reason": "..." }},
+  ...
+]
+"""
+
+# Text-agent outputs that carry no advice worth merging
+_FAILED_OUTPUTS = frozenset({EMPTY_RESPONSE_MSG, UNAVAILABLE_MSG, ""})
+
+# Marks where per-request values are spliced into the router prompt
+_PROMPT_SLOT = "\x00"
+
+_AGENT_DESCRIPTIONS_STR = "\n".join(
+    f"- {a['name']}: {a['description']}"
+    for a in AGENT_DESCRIPTIONS
+)
+
+# Router prompt text before chat history, between history and query,
+# and after the query; rendered once at import
+_ROUTER_PROMPT_HEAD, _ROUTER_PROMPT_MIDDLE, _ROUTER_PROMPT_TAIL = (
+    _ROUTER_PROMPT_TEMPLATE.format(
+        agent_map=_AGENT_DESCRIPTIONS_STR,
+        chat_history=_PROMPT_SLOT,
+        query=_PROMPT_SLOT,
+    ).split(_PROMPT_SLOT)
+)
+
+# Identical queries in the same conversation context route the same way
+_ROUTE_CACHE = LLMCache(maxsize=2048, ttl=3600)
+
 
 def route_query(
     query: Optional[str] = None,
     image_path: Optional[str] = None,
-    session_id: Optional[str] = None 
+    session_id: Optional[str] = None,
+    image_bytes: Optional[bytes] = None,
 ) -> str:
+    """
+    Sync entrypoint for callers outside an event loop.
+    """
+    return asyncio.run(
+        aroute_query(
+            query=query,
+            image_path=image_path,
+            session_id=session_id,
+            image_bytes=image_bytes,
+        )
+    )
+
+
+async def aroute_query(
+    query: Optional[str] = None,
+    image_path: Optional[str] = None,
+    session_id: Optional[str] = None,
+    image_bytes: Optional[bytes] = None,
+) -> str:
+    """
+    Route a query to the expert agents and return the final answer.
+    An uploaded image can be passed in memory as image_bytes; image_path
+    is read from disk otherwise.
+    """
 
     registry = get_agent_registry()
 
@@ -34,12 +127,18 @@ def route_query(
     chat_history_list = get_chat_history(session_id)
     chat_history_str = format_history_for_prompt(chat_history_list)
 
+    # Agents get None rather than the "no previous conversation" placeholder,
+    # so a fresh question can use their semantic cache and FAQ shortcuts
+    agent_history = chat_history_str if chat_history_list else None
+    has_image = bool(image_path or image_bytes)
+
     # Image only
-    if image_path and not clean_query:
-        pest_output = registry["PestAgent"].handle_query(
+    if has_image and not clean_query:
+        pest_output = await registry["PestAgent"].ahandle_query(
             query="",
             image_path=image_path,
-            chat_history=chat_history_str
+            chat_history=agent_history,
+            image_bytes=image_bytes,
         )
 
         payload = {
@@ -58,7 +157,7 @@ def route_query(
         if session_id:
              add_message_to_history(session_id, "user", "Uploaded an image")
              
-        response = registry["FormatterAgent"].handle_query(payload) 
+        response = await registry["FormatterAgent"].ahandle_query(payload) 
         
         if session_id:
              add_message_to_history(session_id, "assistant", response)
@@ -68,8 +167,21 @@ def route_query(
     if not clean_query:
         return "Please ask an agriculture-related question."
 
+    # Vision is the slowest call and doesn't depend on routing,
+    # so start it now and let it overlap the router and text agents
+    pest_task = None
+    if has_image:
+        pest_task = asyncio.create_task(registry["PestAgent"].ahandle_query(
+            query=clean_query,
+            image_path=image_path,
+            chat_history=agent_history,
+            image_bytes=image_bytes,
+        ))
+
     # Text only or Multimodal
-    routed = llm_route_with_scores(clean_query, registry, chat_history_str)
+    routed = await asyncio.to_thread(
+        llm_route_with_scores, clean_query, registry, chat_history_str
+    )
 
     if not routed:
         routed = [{"agent": "CropAgent", "role": "primary", "score": 0}]
@@ -77,7 +189,7 @@ def route_query(
     if not any(r["role"] == "primary" for r in routed):
         routed[0]["role"] = "primary"
 
-    if image_path:
+    if has_image:
         pest_in_route = any(r["agent"] == "PestAgent" for r in routed)
         if not pest_in_route:
             routed.append({
@@ -90,43 +202,76 @@ def route_query(
     
     final_execution_list = routed[:MAX_ROUTED_AGENTS]
     
-    if image_path and not any(r["agent"] == "PestAgent" for r in final_execution_list):
+    if has_image and not any(r["agent"] == "PestAgent" for r in final_execution_list):
          final_execution_list[-1] = {"agent": "PestAgent", "role": "supporting", "score": 100}
 
+    scheduled: List[Dict[str, Any]] = []
+    text_agents = []
+
+    scheduled_names = set()
+
     for item in final_execution_list:
         agent_name = item["agent"]
-        role = item["role"]
-        score = item.get("score", 0)
 
-        if agent_name not in registry:
+        # Never run an agent twice or hand the formatter raw work
+        if (
+            agent_name not in registry
+            or agent_name in NON_ROUTABLE_AGENTS
+            or agent_name in scheduled_names
+        ):
             continue
 
-        if agent_name == "PestAgent" and image_path:
-            output = registry[agent_name].handle_query(
-                query=clean_query, 
-                image_path=image_path,
-                chat_history=chat_history_str
-            )
-        else:
-            output = registry[agent_name].handle_query(
-                query=clean_query,
-                chat_history=chat_history_str
-            )
+        scheduled_names.add(agent_name)
+
+        scheduled.append(item)
+
+        if not (agent_name == "PestAgent" and pest_task):
+            text_agents.append(registry[agent_name])
+
+    # Text agents share one batched Groq submission; the image call overlaps it
+    outputs_by_agent: Dict[str, str] = {}
+    text_outputs, *image_outputs = await asyncio.gather(
+        _run_text_agents_batched(text_agents, clean_query, agent_history),
+        *([pest_task] if pest_task else []),
+    )
+
+    for agent, output in zip(text_agents, text_outputs):
+        outputs_by_agent[agent.name] = output
+
+    if image_outputs:
+        outputs_by_agent["PestAgent"] = image_outputs[0]
 
+    for item in scheduled:
         agent_results.append({
-            "agent": agent_name,
-            "role": role,
-            "score": score,
-            "content": output,
+            "agent": item["agent"],
+            "role": item["role"],
+            "score": item.get("score", 0),
+            "content": outputs_by_agent[item["agent"]],
         })
 
+    merge_results = [
+        res for res in agent_results
+        if str(res["content"]).strip() not in _FAILED_OUTPUTS
+    ]
+
     payload = {
         "user_query": clean_query,
-        "routing_mode": "multimodal" if image_path else "text_only",
-        "agent_results": agent_results,
+        "routing_mode": "multimodal" if has_image else "text_only",
+        "agent_results": merge_results,
     }
 
-    formatted_response = registry["FormatterAgent"].handle_query(payload)
+    if not merge_results:
+        # Nothing to merge, so don't spend a formatter call rephrasing failures
+        formatted_response = UNAVAILABLE_MSG
+    elif (
+        not has_image
+        and len(merge_results) == 1
+        and registry[merge_results[0]["agent"]].self_formatted
+    ):
+        # A lone self-formatted agent already answers in farmer-ready text
+        formatted_response = merge_results[0]["content"]
+    else:
+        formatted_response = await registry["FormatterAgent"].ahandle_query(payload)
 
     if session_id:
         add_message_to_history(session_id, "user", clean_query)
@@ -143,52 +288,123 @@ def route_query(
 
     return formatted_response
 
+async def _run_text_agents_batched(
+    agents: List[Any],
+    query: str,
+    chat_history: Optional[str] = None
+) -> List[str]:
+    """
+    Build every agent's prompt, send them in one batch and record each
+    response against its agent. Agents without a prompt builder fall back
+    to their own handle_query. Context-free questions are first checked
+    against the semantic cache of agents that allow it.
+    """
+
+    if not agents:
+        return []
+
+    cached: List[Optional[str]] = [None] * len(agents)
+    use_cache = not chat_history and any(agent.semantic_cache for agent in agents)
+
+    def build(indexes: List[int]) -> List[Optional[str]]:
+        return [agents[i].build_prompt(query, chat_history) for i in indexes]
+
+    # Prompt building may touch retrieval, so keep it off the event loop.
+    # Prompts the cache can't replace are built while the query is embedded;
+    # cacheable agents wait for the lookup so a hit skips their retrieval
+    eager = [
+        i for i, agent in enumerate(agents)
+        if not (use_cache and agent.semantic_cache)
+    ]
+    lookups = [asyncio.to_thread(build, eager)]
+    if use_cache:
+        lookups.append(aembed_query(query))
+
+    eager_prompts, *embedded = await asyncio.gather(*lookups)
+    prompts = dict(zip(eager, eager_prompts))
+    embedding = embedded[0] if embedded else None
+
+    if embedding is not None:
+        cached = [
+            get_response_cache(agent.name).get(embedding) if agent.semantic_cache else None
+            for agent in agents
+        ]
+
+    pending = [i for i, hit in enumerate(cached) if hit is None]
+
+    late = [i for i in pending if i not in prompts]
+    if late:
+        prompts.update(zip(late, await asyncio.to_thread(build, late)))
+    batch_index = [i for i in pending if prompts[i] is not None]
+    direct_index = [i for i in pending if prompts[i] is None]
+
+    batch_outputs, *direct_outputs = await asyncio.gather(
+        aquery_groq_text_batch([prompts[i] for i in batch_index]),
+        *(
+            agents[i].ahandle_query(query=query, chat_history=chat_history)
+            for i in direct_index
+        ),
+    )
+    outputs: List[str] = [""] * len(agents)
+
+    for i, output in zip(batch_index, batch_outputs):
+        if (
+            embedding is not None
+            and agents[i].semantic_cache
+            and output not in _FAILED_OUTPUTS
+        ):
+            get_response_cache(agents[i].name).set(query, embedding, output)
+        outputs[i] = agents[i].respond_and_record(query, output)
+
+    for i, hit in enumerate(cached):
+        if hit is not None:
+            outputs[i] = agents[i].respond_and_record(query, hit)
+
+    for i, output in zip(direct_index, direct_outputs):
+        outputs[i] = output
+
+    return outputs
+
+
+def _route_cache_key(query: str, chat_history: str) -> tuple:
+    return (" ".join(query.lower().split()), chat_history or "")
+
+
 def llm_route_with_scores(
     query: str,
     registry: Dict[str, Any],
     chat_history: str = ""
 ) -> List[Dict[str, Any]]:
 
-    llm = get_llm()
-
-    agent_map = "\n".join(
-        f"- {a['name']}: {a['description']}"
-        for a in AGENT_DESCRIPTIONS
-    )
+    cache_key = _route_cache_key(query, chat_history)
+    cached = _ROUTE_CACHE.get(cache_key)
+    if cached is not None:
+        # Callers adjust roles in place, so hand out a copy
+        return copy.deepcopy(cached)
 
-    prompt = f"""
-You are an agricultural AI intent router.
+    routes = _llm_route_with_scores(query, registry, chat_history)
 
-TASK:
-Analyze the farmer's query and assign a RELEVANCE SCORE (0-100) to EACH available agent.
+    if routes:
+        _ROUTE_CACHE.set(cache_key, copy.deepcopy(routes))
 
-AVAILABLE AGENTS:
-{agent_map}
+    return routes
 
-PREVIOUS CONVERSATION:
-{chat_history}
 
-RULES:
-1. **Context Awareness**: If the user says "it", "that", or refers to a previous topic, use the HISTORY to infer the crop or issue.
-2. **Score 0-100**: How well does the agent fit the query?
-   - 90-100: Perfect match (Dominant Intent)
-   - 70-89: Strong match
-   - 50-69: Weak/Partial match
-   - <50: Irrelevant
-3. **Dominant Intent**: Identify the single most relevant agent.
-4. **Multi-Intent**: Only include other agents if they truly cover a DISTINCT part of the query (score > 50).
-5. **CropAgent Fallback**: If specific intent is unclear, CropAgent might have a moderate score, but prefer specific agents (Pest, Subsidy, etc.) if symptoms match.
-6. **Output JSON ONLY**: Return a list of objects.
+def _llm_route_with_scores(
+    query: str,
+    registry: Dict[str, Any],
+    chat_history: str = ""
+) -> List[Dict[str, Any]]:
 
-FARMER QUERY:
-"{query}"
+    llm = get_llm()
 
-OUTPUT FORMAT (JSON Array):
-[
-  {{ "agent": "AgentName", "score": 95, "reason": "..." }},
-  ...
-]
-"""
+    prompt = (
+        _ROUTER_PROMPT_HEAD
+        + chat_history
+        + _ROUTER_PROMPT_MIDDLE
+        + query
+        + _ROUTER_PROMPT_TAIL
+    )
 
     try:
 
@@ -198,12 +414,15 @@ OUTPUT FORMAT (JSON Array):
         if not match:
             raise ValueError("No JSON found in router response")
 
-        parsed = json.loads(match.group())
+        parsed = orjson.loads(match.group())
 
         candidates = []
         seen = set()
 
         for item in parsed:
+            if not isinstance(item, dict):
+                continue
+
             agent = item.get("agent")
             score = item.get("score", 0)
 
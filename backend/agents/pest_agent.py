@@ -1,6 +1,27 @@
 from backend.services.text_service import query_groq_text
-from backend.services.vision_service import query_groq_image
-from backend.agents.agri_agent_base import AgriAgentBase
+from backend.services.vision_service import aquery_groq_image, query_groq_image
+from backend.agents.agri_agent_base import SELF_FORMATTED_OUTPUT, AgriAgentBase
+
+_PROMPT_TEMPLATE = (
+    "You are AgriGPT PestAgent. "
+    "Analyze the farmer's description of crop symptoms. "
+    "CONTEXT FROM PREVIOUS CHAT: {chat_history} "
+    "1. VALIDATE: Do these symptoms match known pests/diseases? "
+    "2. DIAGNOSE: List top 2-3 probable causes. "
+    "3. EXPLAIN: Why do these symptoms occur? "
+    "4. ADVISE: Immediate organic or cultural control steps. "
+    "Farmer description: {query} "
+    + SELF_FORMATTED_OUTPUT
+)
+
+_VISION_PROMPT = (
+    "You are AgriGPT Vision, an expert agricultural diagnostics assistant. "
+    "Analyze this crop image in detail. "
+    "1. DESCRIBE symptoms clearly (e.g., yellow halo, brown necrotic spots, white powdery coating). "
+    "2. IDENTIFY the likely issue (fungal, bacterial, pest, or nutrient) if visual evidence is strong. "
+    "3. ESTIMATE severity (mild, moderate, severe) based on visual extent. "
+    "Do not recommend chemical treatments yet. Focus on accurate diagnosis to help other agents provide the solution."
+)
 
 
 class PestAgent(AgriAgentBase):
@@ -10,12 +31,23 @@ class PestAgent(AgriAgentBase):
     Image input ALWAYS takes priority over text.
     """
 
+    __slots__ = ()
+
     name = "PestAgent"
+    self_formatted = True
 
-    def handle_query(self, query: str = None, image_path: str = None, chat_history: str = None) -> str:
+    def handle_query(
+        self,
+        query: str = None,
+        image_path: str = None,
+        chat_history: str = None,
+        image_bytes: bytes = None,
+    ) -> str:
+
+        clean_query = self._normalize_query(query)
 
         # No input
-        if not query and not image_path:
+        if not clean_query and not image_path and not image_bytes:
             response = (
                 "Please upload a crop image or describe visible symptoms such as "
                 "yellowing, spots, holes, insects, wilting, or abnormal leaf color."
@@ -23,18 +55,9 @@ class PestAgent(AgriAgentBase):
             return self.respond_and_record("", response, image_path)
 
         # Image based observations only
-        if image_path:
-            vision_prompt = (
-                "You are AgriGPT Vision, an expert agricultural diagnostics assistant. "
-                "Analyze this crop image in detail. "
-                "1. DESCRIBE symptoms clearly (e.g., yellow halo, brown necrotic spots, white powdery coating). "
-                "2. IDENTIFY the likely issue (fungal, bacterial, pest, or nutrient) if visual evidence is strong. "
-                "3. ESTIMATE severity (mild, moderate, severe) based on visual extent. "
-                "Do not recommend chemical treatments yet. Focus on accurate diagnosis to help other agents provide the solution."
-            )
-
+        if image_path or image_bytes:
             try:
-                result = query_groq_image(image_path, vision_prompt)
+                result = query_groq_image(image_path, _VISION_PROMPT, image_bytes)
             except Exception:
                 result = "The image could not be analyzed clearly."
 
@@ -42,20 +65,10 @@ class PestAgent(AgriAgentBase):
                 "Image-based symptom observation",
                 result,
                 image_path=image_path,
+                has_image=True,
             )
 
-        clean_query = query.strip()
-
-        text_prompt = (
-            "You are AgriGPT PestAgent. "
-            "Analyze the farmer's description of crop symptoms. "
-            f"CONTEXT FROM PREVIOUS CHAT: {chat_history if chat_history else 'None'} "
-            "1. VALIDATE: Do these symptoms match known pests/diseases? "
-            "2. DIAGNOSE: List top 2-3 probable causes. "
-            "3. EXPLAIN: Why do these symptoms occur? "
-            "4. ADVISE: Immediate organic or cultural control steps. "
-            f"Farmer description: {clean_query}"
-        )
+        text_prompt = self.build_prompt(clean_query, chat_history)
 
         try:
             result = query_groq_text(text_prompt)
@@ -67,3 +80,34 @@ class PestAgent(AgriAgentBase):
             result,
             image_path=image_path,
         )
+
+    async def ahandle_query(
+        self,
+        query: str = None,
+        image_path: str = None,
+        chat_history: str = None,
+        image_bytes: bytes = None,
+    ) -> str:
+
+        if not image_path and not image_bytes:
+            return await super().ahandle_query(query, image_path, chat_history)
+
+        # Vision call runs natively on the event loop
+        try:
+            result = await aquery_groq_image(image_path, _VISION_PROMPT, image_bytes)
+        except Exception:
+            result = "The image could not be analyzed clearly."
+
+        return self.respond_and_record(
+            "Image-based symptom observation",
+            result,
+            image_path=image_path,
+            has_image=True,
+        )
+
+    def build_prompt(self, query: str, chat_history: str = None) -> str:
+
+        return _PROMPT_TEMPLATE.format(
+            chat_history=chat_history if chat_history else 'None',
+            query=query,
+        )
@@ -1,9 +1,88 @@
-from backend.services.text_service import query_groq_text
+from backend.services.text_service import (
+    query_groq_text,
+    EMPTY_RESPONSE_MSG,
+    UNAVAILABLE_MSG,
+)
+from backend.core.response_cache import cached_llm_call
 from backend.agents.agri_agent_base import AgriAgentBase
-from backend.services.rag_service import rag_service
+from backend.services.rag_service import get_rag
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+import re
 import unicodedata
 
 
+# Wide bi-encoder recall, then keep the few best after cross-encoder rerank
+RETRIEVE_TOP_K = 20
+RERANK_TOP_N = 3
+
+# Short questions that match one scheme this closely are answered from
+# the scheme record directly, without an LLM call
+FAQ_MIN_RELEVANCE = 0.95
+FAQ_MAX_WORDS = 8
+
+# Characters stripped from queries in a single pass
+_CTRL_RE = re.compile("[\x00\u200b\u200c\ufeff]")
+
+# One retrieved scheme, as embedded in the prompt
+_SCHEME_TEMPLATE = (
+    "Scheme information {index}: "
+    "Scheme name: {scheme_name}. "
+    "Eligibility: {eligibility}. "
+    "Benefits: {benefits}. "
+    "Application steps: {application_steps}. "
+    "Required documents: {documents}. "
+    "Additional notes: {notes}. "
+)
+
+# Subsidy prompt: fixed instructions lead so every call shares the same
+# prefix; per-request history, question and retrieved data come last
+_PROMPT_TEMPLATE = " ".join([
+    "You are AgriGPT SubsidyAgent.",
+    "You explain Indian agricultural subsidy schemes using ONLY verified official information provided below.",
+    "Do not invent schemes, eligibility criteria, benefits, or application rules.",
+    "If information is missing or unclear, state that clearly.",
+    "Do not generalize nationwide rules unless explicitly stated.",
+    "Present the information in simple, farmer-friendly language.",
+    "Avoid legal or technical jargon.",
+    "Do not provide advice beyond explaining what the scheme offers and how to apply.",
+    "Previous context: {chat_history}.",
+    "Farmer question: {query}.",
+    "Official information: {context}",
+])
+
+# Direct answer for a high-confidence single-scheme match
+_FAQ_TEMPLATE = (
+    "{scheme_name}\n"
+    "Eligibility: {eligibility}\n"
+    "Benefits: {benefits}\n"
+    "How to apply: {application_steps}\n"
+    "Required documents: {documents}\n"
+    "Notes: {notes}"
+)
+
+_NO_INFO_MSG = "Subsidy information could not be generated at this time."
+
+
+@lru_cache(maxsize=1024)
+def _sanitize_query_impl(text: str) -> str:
+    # ASCII is already NFKC-normal; otherwise only normalize when needed
+    if not text.isascii() and not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+    return _CTRL_RE.sub("", text).strip()
+
+
+@lru_cache(maxsize=256)
+def _lookup_schemes(query: str) -> Tuple[Dict[str, Any], ...]:
+    """Retrieve and rerank schemes for a sanitized query."""
+    rag = get_rag()
+    return tuple(rag.rerank(
+        query,
+        rag.retrieve(query, k=RETRIEVE_TOP_K),
+        top_n=RERANK_TOP_N,
+    ))
+
+
 class SubsidyAgent(AgriAgentBase):
     """
     SubsidyAgent:
@@ -11,14 +90,13 @@ class SubsidyAgent(AgriAgentBase):
     Uses retrieved official data as the primary source.
     """
 
+    __slots__ = ()
+
     name = "SubsidyAgent"
+    semantic_cache = True
 
     def _sanitize_query(self, text: str) -> str:
-        if not text:
-            return ""
-        text = unicodedata.normalize("NFKC", text)
-        text = text.replace("\x00", "").replace("\u200c", "")
-        return text.strip()
+        return _sanitize_query_impl(text) if text else ""
 
     def handle_query(self, query: str = None, image_path: str = None, chat_history: str = None) -> str:
 
@@ -31,45 +109,100 @@ class SubsidyAgent(AgriAgentBase):
 
         query_clean = self._sanitize_query(query)
 
-        context_str = ""
+        try:
+            if chat_history:
+                result = self._answer(query_clean, chat_history)
+            else:
+                result = cached_llm_call(
+                    self.name,
+                    query_clean,
+                    lambda: self._answer(query_clean),
+                    skip_values=(EMPTY_RESPONSE_MSG, UNAVAILABLE_MSG),
+                )
+        except Exception:
+            result = _NO_INFO_MSG
+
+        return self.respond_and_record(query_clean, result, image_path)
+
+    def _answer(self, query: str, chat_history: str = None) -> str:
+
+        docs, context_str = self._retrieve_context(query)
+
+        faq = self._faq_answer(query, docs, chat_history)
+        if faq is not None:
+            return faq
+
+        return query_groq_text(self._render_prompt(query, chat_history, context_str))
+
+    def build_prompt(self, query: str, chat_history: str = None) -> Optional[str]:
+
+        query = self._sanitize_query(query)
+        docs, context_str = self._retrieve_context(query)
+
+        # No prompt needed; handle_query answers from the scheme record
+        if self._faq_answer(query, docs, chat_history) is not None:
+            return None
+
+        return self._render_prompt(query, chat_history, context_str)
+
+    def _faq_answer(
+        self,
+        query: str,
+        docs: Tuple[Dict[str, Any], ...],
+        chat_history: str = None,
+    ) -> Optional[str]:
+
+        if chat_history or not docs or len(query.split()) >= FAQ_MAX_WORDS:
+            return None
+
+        # Reranked docs put the best match last
+        top = docs[-1]
+        if top.get("relevance", 0.0) <= FAQ_MIN_RELEVANCE:
+            return None
+        if not top.get("eligibility") or not top.get("benefits"):
+            return None
+
+        return _FAQ_TEMPLATE.format(
+            scheme_name=top.get("scheme_name", "Not specified"),
+            eligibility=top["eligibility"],
+            benefits=top["benefits"],
+            application_steps=top.get("application_steps") or "Not specified",
+            documents=top.get("documents") or "Not specified",
+            notes=top.get("notes") or "None",
+        )
+
+    def _retrieve_context(self, query: str) -> Tuple[Tuple[Dict[str, Any], ...], str]:
+
+        retrieved_docs: Tuple[Dict[str, Any], ...] = ()
 
         try:
-            retrieved_docs = rag_service.retrieve(query_clean)
+            retrieved_docs = _lookup_schemes(query)
 
             if retrieved_docs:
-                for i, doc in enumerate(retrieved_docs, 1):
-                    context_str += (
-                        f"Scheme information {i}: "
-                        f"Scheme name: {doc.get('scheme_name', 'Not specified')}. "
-                        f"Eligibility: {doc.get('eligibility', 'Not specified')}. "
-                        f"Benefits: {doc.get('benefits', 'Not specified')}. "
-                        f"Application steps: {doc.get('application_steps', 'Not specified')}. "
-                        f"Required documents: {doc.get('documents', 'Not specified')}. "
-                        f"Additional notes: {doc.get('notes', 'Not specified')}. "
+                context_str = "".join(
+                    _SCHEME_TEMPLATE.format(
+                        index=i,
+                        scheme_name=doc.get('scheme_name', 'Not specified'),
+                        eligibility=doc.get('eligibility', 'Not specified'),
+                        benefits=doc.get('benefits', 'Not specified'),
+                        application_steps=doc.get('application_steps', 'Not specified'),
+                        documents=doc.get('documents', 'Not specified'),
+                        notes=doc.get('notes', 'Not specified'),
                     )
+                    for i, doc in enumerate(retrieved_docs, 1)
+                )
             else:
                 context_str = "No verified government scheme information was found for this query."
 
         except Exception as e:
             context_str = f"An error occurred while retrieving official information: {str(e)}"
 
-        prompt = (
-            "You are AgriGPT SubsidyAgent. "
-            "You explain Indian agricultural subsidy schemes using ONLY verified official information provided below. "
-            "Do not invent schemes, eligibility criteria, benefits, or application rules. "
-            "If information is missing or unclear, state that clearly. "
-            "Do not generalize nationwide rules unless explicitly stated. "
-            "Present the information in simple, farmer-friendly language. "
-            "Avoid legal or technical jargon. "
-            "Do not provide advice beyond explaining what the scheme offers and how to apply. "
-            f"Previous context: {chat_history if chat_history else 'None'}. "
-            f"Farmer question: {query_clean}. "
-            f"Official information: {context_str}"
-        )
+        return retrieved_docs, context_str
 
-        try:
-            result = query_groq_text(prompt)
-        except Exception:
-            result = "Subsidy information could not be generated at this time."
+    def _render_prompt(self, query: str, chat_history: str, context_str: str) -> str:
 
-        return self.respond_and_record(query_clean, result, image_path)
+        return _PROMPT_TEMPLATE.format(
+            chat_history=chat_history if chat_history else 'None',
+            query=query,
+            context=context_str,
+        )
@@ -1,7 +1,37 @@
-from backend.services.text_service import query_groq_text
+from backend.services.text_service import (
+    query_groq_text,
+    EMPTY_RESPONSE_MSG,
+    UNAVAILABLE_MSG,
+)
+from backend.core.response_cache import cached_llm_call
 from backend.agents.agri_agent_base import AgriAgentBase
 
 
+# Yield prompt: fixed instructions lead so every call shares the same
+# prefix; per-request history and question come last
+_PROMPT_TEMPLATE = " ".join([
+    "You are AgriGPT YieldAgent.",
+    "Your role is to analyze yield-related problems conservatively.",
+    "Do not give guaranteed yield numbers or exact targets.",
+    "Use conditional language only.",
+    "Do not prescribe chemical dosages or irrigation schedules.",
+    "Do not override crop, irrigation, or pest specialists.",
+    "Explain the following clearly and simply:",
+    "First, describe broad expected yield ranges only if crop and region are mentioned,",
+    "and clearly state that actual yield depends on conditions.",
+    "Next, identify the most common limiting factors that reduce yield,",
+    "such as soil fertility gaps, water stress, planting time, seed quality,",
+    "pest pressure, or climate stress.",
+    "Then, suggest practical next steps focused on diagnosis and prioritization only,",
+    "for example soil testing, irrigation review, or pest inspection,",
+    "without giving exact schedules or dosages.",
+    "If important details are missing, say so clearly.",
+    "Keep the language farmer-friendly and non-technical.",
+    "Avoid repetition and avoid theory.",
+    "PREVIOUS CONTEXT: {chat_history}",
+    "Farmer question: {query}",
+])
+
 class YieldAgent(AgriAgentBase):
     """
     YieldAgent:
@@ -9,49 +39,32 @@ class YieldAgent(AgriAgentBase):
     high-level, conditional yield improvement guidance.
     """
 
+    __slots__ = ()
+
     name = "YieldAgent"
+    semantic_cache = True
 
     def handle_query(self, query: str = None, image_path: str = None, chat_history: str = None) -> str:
 
-        if not query or not isinstance(query, str) or not query.strip():
+        clean_query = self._normalize_query(query)
+
+        if not clean_query:
             response = (
                 "Please describe the crop and the yield issue you are facing. "
                 "For example, low harvest, poor fruit setting, or reduced grain output."
             )
             return self.respond_and_record("", response, image_path)
 
-        clean_query = query.strip()
-
-        prompt = (
-            "You are AgriGPT YieldAgent. "
-            "Your role is to analyze yield-related problems conservatively. "
-            "Do not give guaranteed yield numbers or exact targets. "
-            "Use conditional language only. "
-            "Do not prescribe chemical dosages or irrigation schedules. "
-            "Do not override crop, irrigation, or pest specialists. "
-
-            "Explain the following clearly and simply: "
-            "First, describe broad expected yield ranges only if crop and region are mentioned, "
-            "and clearly state that actual yield depends on conditions. "
-
-            "Next, identify the most common limiting factors that reduce yield, "
-            "such as soil fertility gaps, water stress, planting time, seed quality, "
-            "pest pressure, or climate stress. "
-
-            "Then, suggest practical next steps focused on diagnosis and prioritization only, "
-            "for example soil testing, irrigation review, or pest inspection, "
-            "without giving exact schedules or dosages. "
-
-            "If important details are missing, say so clearly. "
-            "Keep the language farmer-friendly and non-technical. "
-            "Avoid repetition and avoid theory. "
-            
-            f"PREVIOUS CONTEXT: {chat_history if chat_history else 'None'}"
-            f"Farmer question: {clean_query}"
-        )
-
         try:
-            result = query_groq_text(prompt)
+            if chat_history:
+                result = query_groq_text(self.build_prompt(clean_query, chat_history))
+            else:
+                result = cached_llm_call(
+                    self.name,
+                    clean_query,
+                    lambda: query_groq_text(self.build_prompt(clean_query)),
+                    skip_values=(EMPTY_RESPONSE_MSG, UNAVAILABLE_MSG),
+                )
         except Exception:
             result = "Yield analysis could not be generated at this time."
 
@@ -60,3 +73,10 @@ class YieldAgent(AgriAgentBase):
             response=result,
             image_path=image_path,
         )
+
+    def build_prompt(self, query: str, chat_history: str = None) -> str:
+
+        return _PROMPT_TEMPLATE.format(
+            chat_history=chat_history if chat_history else 'None',
+            query=query,
+        )
@@ -14,6 +14,17 @@ class Settings(BaseSettings):
 
     DEBUG: bool = False
 
+    # Load the RAG models at startup rather than on the first subsidy query
+    RAG_WARMUP: bool = True
+
+    # Coalesce concurrent image queries into multi-image vision requests
+    VISION_BATCHING: bool = False
+
+    # Admission control for Groq vision calls, per event loop; a zero
+    # request rate disables pacing
+    VISION_MAX_CONCURRENCY: int = 8
+    VISION_MAX_RPM: int = 0
+
     model_config = SettingsConfigDict(
         env_file=str(BASE_DIR / ".env"),
         env_file_encoding="utf-8",
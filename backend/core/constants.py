@@ -0,0 +1,8 @@
+# Shared by the upload route and the vision service; kept free of heavy
+# imports so routes can use it without loading the vision clients
+
+# Leading bytes each supported image type must start with
+IMAGE_SIGNATURES = {
+    "image/jpeg": b"\xff\xd8\xff",
+    "image/png": b"\x89PNG\r\n\x1a\n",
+}
@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import Dict, List, TypeAlias
+from types import MappingProxyType
+from typing import List, Mapping, TypeAlias
 
 from backend.agents.crop_agent import CropAgent
 from backend.agents.irrigation_agent import IrrigationAgent
@@ -8,23 +9,28 @@ from backend.agents.subsidy_agent import SubsidyAgent
 from backend.agents.yield_agent import YieldAgent
 from backend.agents.formatter_agent import FormatterAgent
 
-AgentRegistry: TypeAlias = Dict[str, object]
+AgentRegistry: TypeAlias = Mapping[str, object]
 
 # FormatterAgent must never be selected by router
-NON_ROUTABLE_AGENTS = {"FormatterAgent"}
+NON_ROUTABLE_AGENTS = frozenset({"FormatterAgent"})
+
+# Agents hold no per-request state, so one instance of each is shared.
+# Read-only so no caller can alter routing for everyone else.
+AGENT_REGISTRY: AgentRegistry = MappingProxyType({
+    "CropAgent": CropAgent(),
+    "PestAgent": PestAgent(),
+    "IrrigationAgent": IrrigationAgent(),
+    "SubsidyAgent": SubsidyAgent(),
+    "YieldAgent": YieldAgent(),
+    "FormatterAgent": FormatterAgent(),
+})
+
 
 def get_agent_registry() -> AgentRegistry:
     """
-    Return a fresh registry on each call.
+    Return the shared, read-only agent registry.
     """
-    return {
-        "CropAgent": CropAgent(),
-        "PestAgent": PestAgent(),
-        "IrrigationAgent": IrrigationAgent(),
-        "SubsidyAgent": SubsidyAgent(),
-        "YieldAgent": YieldAgent(),
-        "FormatterAgent": FormatterAgent(),
-    }
+    return AGENT_REGISTRY
 
 # Router Metadata
 AGENT_DESCRIPTIONS: List[dict] = [
@@ -1,13 +1,167 @@
 from __future__ import annotations
-from langchain_groq import ChatGroq
+import asyncio
+import random
+import weakref
+from typing import TYPE_CHECKING, Optional
+
+import httpx
 from backend.core.config import settings
 
+if TYPE_CHECKING:
+    from langchain_groq import ChatGroq
 
-def get_llm() -> ChatGroq:
+HTTP_TIMEOUT_SECONDS = 30.0
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+# Stale pooled sockets are replaced by the transport retrying the connect,
+# so no liveness probe is needed
+HTTP_CONNECT_RETRIES = 2
+
+# Retry backoff for Groq calls
+RETRY_BACKOFF_BASE_SECONDS = 1.0
+RETRY_BACKOFF_CAP_SECONDS = 8.0
+
+
+def _build_http_client() -> httpx.Client:
+    return httpx.Client(
+        timeout=HTTP_TIMEOUT_SECONDS,
+        transport=httpx.HTTPTransport(
+            http2=True,
+            limits=HTTP_LIMITS,
+            retries=HTTP_CONNECT_RETRIES,
+        ),
+    )
+
+
+# One pooled HTTP/2 client per process so Groq calls reuse TLS connections;
+# replaced by reset_llm() after connection failures
+_http_client = _build_http_client()
+
+# Async connections are bound to the loop that opened them
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def retry_delay(previous: float, error: Optional[BaseException] = None) -> float:
+    """
+    Seconds to wait before retrying a failed Groq call: the server's
+    Retry-After when it sends one, otherwise decorrelated jitter so
+    clients hit by the same outage don't retry in lock-step.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers:
+        try:
+            return min(float(headers.get("retry-after")), RETRY_BACKOFF_CAP_SECONDS)
+        except (TypeError, ValueError):
+            pass
+
+    return min(
+        RETRY_BACKOFF_CAP_SECONDS,
+        random.uniform(RETRY_BACKOFF_BASE_SECONDS, previous * 3),
+    )
+
+
+def get_http_client() -> httpx.Client:
+    return _http_client
+
+
+def get_async_http_client() -> Optional[httpx.AsyncClient]:
+    """
+    Return the pooled async client for the running event loop,
+    or None when called outside a loop.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+    client = _async_http_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_SECONDS,
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                limits=HTTP_LIMITS,
+                retries=HTTP_CONNECT_RETRIES,
+            ),
+        )
+        _async_http_clients[loop] = client
+    return client
+
+
+# Built lazily and reused; dropped by reset_llm() after connection failures
+_cached_llm: Optional[ChatGroq] = None
+_async_llms: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, ChatGroq]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _build_fresh_llm(http_async_client: Optional[httpx.AsyncClient] = None) -> ChatGroq:
+    # LangChain is slow to import; image-only requests never need it
+    from langchain_groq import ChatGroq
 
     return ChatGroq(
         api_key=settings.GROQ_API_KEY,
         model=settings.TEXT_MODEL_NAME,
         temperature=0.2,
         max_tokens=1500,
+        http_client=_http_client,
+        http_async_client=http_async_client,
     )
+
+
+async def aclose_http_clients() -> None:
+    """Close the running loop's pooled async client, e.g. on app shutdown."""
+    loop = asyncio.get_running_loop()
+    _async_llms.pop(loop, None)
+    client = _async_http_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_llm() -> ChatGroq:
+    """
+    Return the shared ChatGroq client. Inside an event loop this is the
+    loop's own instance, so async calls use that loop's connection pool.
+    """
+    global _cached_llm
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is None:
+        if _cached_llm is None:
+            _cached_llm = _build_fresh_llm()
+        return _cached_llm
+
+    llm = _async_llms.get(loop)
+    if llm is None:
+        llm = _build_fresh_llm(get_async_http_client())
+        _async_llms[loop] = llm
+    return llm
+
+
+def reset_llm() -> None:
+    """
+    Forget the cached clients and the connection pool the caller was using,
+    so the next get_llm() reconnects instead of reusing broken sockets.
+    Stale pools are not closed here: other threads or coroutines may still
+    be finishing requests on them, and they are released once unreferenced.
+    """
+    global _cached_llm, _http_client
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    if loop is None:
+        _http_client = _build_http_client()
+    else:
+        _async_http_clients.pop(loop, None)
+
+    _cached_llm = None
+    _async_llms.clear()
@@ -0,0 +1,161 @@
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+SEMANTIC_CACHE_MAX_SIZE = 512
+SEMANTIC_CACHE_TTL_SECONDS = 3600
+SIMILARITY_THRESHOLD = 0.92
+
+
+class SemanticCache:
+    """
+    Bounded LRU of (embedding, response) pairs with a per-entry TTL.
+    A lookup returns the response whose query embedding is most similar
+    to the given one, if the cosine similarity clears the threshold.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = SEMANTIC_CACHE_MAX_SIZE,
+        ttl: float = SEMANTIC_CACHE_TTL_SECONDS,
+        threshold: float = SIMILARITY_THRESHOLD,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stacked embeddings so one matrix product scores every entry
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+
+    def _drop_expired(self) -> None:
+        now = time.monotonic()
+        expired = [k for k, (expires_at, _, _) in self._entries.items() if expires_at < now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def get(self, embedding: np.ndarray) -> Optional[str]:
+        with self._lock:
+            self._drop_expired()
+            if not self._entries:
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k][1] for k in self._matrix_keys])
+
+            scores = self._matrix @ embedding
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            return self._entries[key][2]
+
+    def set(self, key: str, embedding: np.ndarray, response: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, embedding, response)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+            self._matrix = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_caches: Dict[str, SemanticCache] = {}
+
+
+def get_response_cache(agent_name: str) -> SemanticCache:
+    return _caches.setdefault(agent_name, SemanticCache())
+
+
+def embed_query(text: str) -> Optional[np.ndarray]:
+    """
+    Unit-length embedding of a query using the RAG embedding model,
+    or None if it can't be computed.
+    """
+    if not text:
+        return None
+
+    # Loaded on first use; the RAG model is heavy
+    from backend.services.rag_service import get_rag
+
+    try:
+        vector = get_rag().embed_query(text)
+    except Exception:
+        return None
+
+    return _unit(vector)
+
+
+async def aembed_query(text: str) -> Optional[np.ndarray]:
+    """Async embed_query that waits on the embedding batch without a thread."""
+    if not text:
+        return None
+
+    from backend.services.rag_service import get_rag
+
+    try:
+        vector = await get_rag().aembed_query(text)
+    except Exception:
+        return None
+
+    return _unit(vector)
+
+
+def _unit(vector) -> Optional[np.ndarray]:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if not norm:
+        return None
+    return vector / norm
+
+
+def cached_llm_call(
+    agent_name: str,
+    query_clean: str,
+    call: Callable[[], str],
+    skip_values: Iterable[str] = (),
+) -> str:
+    """
+    Return a cached answer to a near-identical earlier query for this agent,
+    otherwise run call() and cache its result.
+    Responses listed in skip_values (transient failures) are never stored.
+    """
+    cache = get_response_cache(agent_name)
+    embedding = embed_query(query_clean)
+
+    if embedding is not None:
+        cached = cache.get(embedding)
+        if cached is not None:
+            return cached
+
+    result = call()
+
+    if (
+        embedding is not None
+        and isinstance(result, str)
+        and result
+        and result not in frozenset(skip_values)
+    ):
+        cache.set(query_clean, embedding, result)
+
+    return result
@@ -1,17 +1,63 @@
+import asyncio
+from typing import Any
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 # Routers
 from backend.routes.health_router import router as health_router
 from backend.routes.ask_router import router as ask_router
 from backend.routes.weather_router import router as weather_router
+from backend.core.config import settings
+from backend.core.llm_client import aclose_http_clients, get_llm
+import orjson
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the LLM clients (sync for worker threads, async for this loop)
+    # and warm the RAG models before the first request arrives; the two
+    # are independent, so they load side by side
+    warmups = {"LLM client": asyncio.to_thread(get_llm)}
+    if settings.RAG_WARMUP:
+        from backend.services.rag_service import get_rag
+
+        warmups["RAG models"] = asyncio.to_thread(lambda: get_rag().warmup())
+
+    # A failed warm-up only costs the lazy load on first use; other
+    # routes must still come up
+    results = await asyncio.gather(*warmups.values(), return_exceptions=True)
+    for name, result in zip(warmups, results):
+        if isinstance(result, Exception):
+            print(f" WARNING: {name} warm-up failed: {result}")
+
+    try:
+        get_llm()
+    except Exception as e:
+        print(f" WARNING: async LLM client warm-up failed: {e}")
+
+    print("AgriGPT Backend Started: Ready to accept queries")
+    yield
+    print(" AgriGPT Backend Shutting down....")
+    await aclose_http_clients()
+
+
+class ORJSONResponse(JSONResponse):
+    # The routes return plain dicts, so serialize them with orjson here
+    # rather than through FastAPI's deprecated ORJSONResponse
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
 
 app = FastAPI(
     title="AgriGPT Backend",
     description="Multimodal AI farming assistant with Groq",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -47,11 +93,3 @@ def root():
             "/docs"
         ]
     }
-
-@app.on_event("startup")
-async def startup_event():
-    print("AgriGPT Backend Started: Ready to accept queries")
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    print(" AgriGPT Backend Shutting down....")
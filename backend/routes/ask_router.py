@@ -1,100 +1,120 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
-import tempfile
-import os
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 import time
 import uuid
 from typing import Optional
 
+from backend.core.constants import IMAGE_SIGNATURES
+
 router = APIRouter(prefix="/ask", tags=["Query"])
 
-ALLOWED_IMAGE_MIME = {"image/jpeg", "image/png"}
+ALLOWED_IMAGE_MIME = frozenset(IMAGE_SIGNATURES)
 MAX_UPLOAD_BYTES = 8 * 1024 * 1024
 MAX_QUERY_CHARS = 2000
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 
-@router.post("/text")
-async def ask_text(
-    query: str = Form(...),
-    session_id: Optional[str] = Form(None) 
-):
-    """Text-only farming query endpoint."""
-    start = time.time()
-    
-    if not query or not query.strip():
-        raise HTTPException(400, "Please enter a text query.")
-    
-    query = query.strip()
+async def _read_upload(file: UploadFile) -> bytes:
+    """
+    Read an uploaded image in fixed-size chunks, enforcing the size limit
+    and checking that its magic bytes match the declared content type,
+    so mislabelled or polyglot files are rejected. The bytes are handed
+    straight to the agents, so nothing is written to disk.
+    """
+    if file.content_type not in ALLOWED_IMAGE_MIME:
+        raise HTTPException(415, "Only JPEG/PNG images allowed.")
+
+    # Starlette knows the spooled size; reject oversize files unread
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(413, "File too large (max 8MB).")
+
+    chunk = await file.read(UPLOAD_CHUNK_BYTES)
+
+    if not chunk:
+        raise HTTPException(400, "Empty image file.")
+
+    signature = IMAGE_SIGNATURES.get(file.content_type)
+    if signature is None or not chunk.startswith(signature):
+        raise HTTPException(415, "Only JPEG/PNG images allowed.")
+
+    chunks = []
+    total = 0
+    while chunk:
+        total += len(chunk)
+        if total > MAX_UPLOAD_BYTES:
+            raise HTTPException(413, "File too large (max 8MB).")
+        chunks.append(chunk)
+        chunk = await file.read(UPLOAD_CHUNK_BYTES)
+
+    return b"".join(chunks)
+
+
+def _clean_query(query: str, empty_msg: str) -> str:
+    query = query.strip() if query else ""
+
+    if not query:
+        raise HTTPException(400, empty_msg)
+
     if len(query) > MAX_QUERY_CHARS:
         raise HTTPException(413, f"Query too long. Max {MAX_QUERY_CHARS} chars.")
-    
-    from backend.agents.master_agent import route_query
-    
+
+    return query
+
+
+async def _analyze(
+    query: Optional[str],
+    session_id: Optional[str],
+    image_bytes: Optional[bytes] = None,
+) -> str:
+    from backend.agents.master_agent import aroute_query
+
     try:
-        response = route_query(query=query, image_path=None, session_id=session_id)
+        response = await aroute_query(
+            query=query, session_id=session_id, image_bytes=image_bytes
+        )
     except Exception as e:
         raise HTTPException(500, f"Error: {str(e)}")
-    
+
+    return str(response)
+
+
+def _make_response(start: float, analysis: str, **fields) -> dict:
     return {
-        "request_id": str(uuid.uuid4()),
+        "request_id": uuid.uuid4().hex,
         "status": "success",
-        "elapsed_ms": int((time.time() - start) * 1000),
-        "query": query,
-        "analysis": str(response)
+        "elapsed_ms": int((time.perf_counter() - start) * 1000),
+        **fields,
+        "analysis": analysis,
     }
 
 
+@router.post("/text")
+async def ask_text(
+    query: str = Form(...),
+    session_id: Optional[str] = Form(None) 
+):
+    """Text-only farming query endpoint."""
+    start = time.perf_counter()
+    query = _clean_query(query, "Please enter a text query.")
+
+    analysis = await _analyze(query, session_id)
+    return _make_response(start, analysis, query=query)
+
+
 @router.post("/image")
 async def ask_image(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     session_id: Optional[str] = Form(None) 
 ):
     """Image-only crop analysis endpoint."""
-    start = time.time()
-    tmp_path = ""
-    
-    if file.content_type not in ALLOWED_IMAGE_MIME:
-        raise HTTPException(415, "Only JPEG/PNG images allowed.")
-    
-    try:
-        data = await file.read()
-        
-        if not data:
-            raise HTTPException(400, "Empty image file.")
-        
-        if len(data) > MAX_UPLOAD_BYTES:
-            raise HTTPException(413, "File too large (max 8MB).")
-        
-        ext = ".jpg" if file.content_type == "image/jpeg" else ".png"
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            tmp.write(data)
-            tmp_path = tmp.name
-        
-        from backend.agents.master_agent import route_query
-        response = route_query(query=None, image_path=tmp_path, session_id=session_id)
-        
-        background_tasks.add_task(os.remove, tmp_path)
-        
-        return {
-            "request_id": str(uuid.uuid4()),
-            "status": "success",
-            "elapsed_ms": int((time.time() - start) * 1000),
-            "image_uploaded": True,
-            "analysis": str(response)
-        }
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        if tmp_path and os.path.exists(tmp_path):
-            background_tasks.add_task(os.remove, tmp_path)
-        raise HTTPException(500, f"Error: {str(e)}")
+    start = time.perf_counter()
+    image_bytes = await _read_upload(file)
+
+    analysis = await _analyze(None, session_id, image_bytes)
+    return _make_response(start, analysis, image_uploaded=True)
 
 
 @router.post("/chat")
 async def ask_chat(
-    background_tasks: BackgroundTasks,
     query: str = Form(...),
     file: UploadFile = File(None),
     session_id: Optional[str] = Form(None) 
@@ -103,68 +123,18 @@ async def ask_chat(
     Multimodal endpoint: text + optional image.
     Combines both analyses intelligently.
     """
-    start = time.time()
-    query_clean = query.strip()
-    
-    if not query_clean:
-        raise HTTPException(400, "Query cannot be empty")
-    
-    if len(query_clean) > MAX_QUERY_CHARS:
-        raise HTTPException(413, f"Query too long. Max {MAX_QUERY_CHARS} chars.")
-    
-    from backend.agents.master_agent import route_query
-    
+    start = time.perf_counter()
+    query = _clean_query(query, "Query cannot be empty")
+
     # Text only (no file uploaded)
     if not file or not file.filename:
-        try:
-            response = route_query(query=query_clean, image_path=None, session_id=session_id)
-        except Exception as e:
-            raise HTTPException(500, f"Error: {str(e)}")
-        
-        return {
-            "request_id": str(uuid.uuid4()),
-            "status": "success",
-            "elapsed_ms": int((time.time() - start) * 1000),
-            "mode": "text_only",
-            "query": query_clean,
-            "analysis": str(response)
-        }
-    
+        analysis = await _analyze(query, session_id)
+        return _make_response(start, analysis, mode="text_only", query=query)
+
     # Multimodal (text + image)
-    if file.content_type not in ALLOWED_IMAGE_MIME:
-        raise HTTPException(415, "Only JPEG/PNG images allowed.")
-    
-    tmp_path = ""
-    
-    try:
-        data = await file.read()
-        
-        if len(data) > MAX_UPLOAD_BYTES:
-            raise HTTPException(413, "File too large (max 8MB).")
-        
-        ext = ".jpg" if file.content_type == "image/jpeg" else ".png"
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            tmp.write(data)
-            tmp_path = tmp.name
-        
-        response = route_query(query=query_clean, image_path=tmp_path, session_id=session_id)
-        
-        background_tasks.add_task(os.remove, tmp_path)
-        
-        return {
-            "request_id": str(uuid.uuid4()),
-            "status": "success",
-            "elapsed_ms": int((time.time() - start) * 1000),
-            "mode": "multimodal",
-            "query": query_clean,
-            "image_uploaded": True,
-            "analysis": str(response)
-        }
-    
-    except HTTPException:
-        raise
-    except Exception as e:
-        if tmp_path and os.path.exists(tmp_path):
-            background_tasks.add_task(os.remove, tmp_path)
-        raise HTTPException(500, f"Error: {str(e)}")
+    image_bytes = await _read_upload(file)
+
+    analysis = await _analyze(query, session_id, image_bytes)
+    return _make_response(
+        start, analysis, mode="multimodal", query=query, image_uploaded=True
+    )
@@ -9,24 +9,40 @@ router = APIRouter(prefix="/health", tags=["Health"])
 
 START_TIME = time.time()
 
+# Dependency status is recomputed at most this often
+HEALTH_PROBE_TTL_SECONDS = 30
+_probe = {"checked_at": None, "groq_status": "unknown"}
+
 def _format_uptime(seconds: int) -> str:
     """Convert seconds to HH:MM:SS."""
     return str(timedelta(seconds=seconds))
 
 
-@router.get("/")
-async def health_check():
-
-
-    uptime_sec = int(time.time() - START_TIME)
+def _groq_status() -> str:
+    """Groq client status, cached for HEALTH_PROBE_TTL_SECONDS."""
+    now = time.monotonic()
+    checked_at = _probe["checked_at"]
+    if checked_at is not None and now - checked_at < HEALTH_PROBE_TTL_SECONDS:
+        return _probe["groq_status"]
 
     try:
-        llm = get_llm()
+        get_llm()
         model_ok = bool(settings.TEXT_MODEL_NAME) and bool(settings.GROQ_API_KEY)
         groq_status = "configured" if model_ok else "not_configured"
     except Exception as e:
         groq_status = f"error: {str(e)}"
 
+    _probe.update(checked_at=now, groq_status=groq_status)
+    return groq_status
+
+
+@router.get("/")
+async def health_check():
+
+
+    uptime_sec = int(time.time() - START_TIME)
+    groq_status = _groq_status()
+
     return {
         "status": "OK",
         "service": "AgriGPT Backend",
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Query
-from backend.services.weather_service import get_current_weather
+from backend.services.weather_service import get_current_weather_async
 
 router = APIRouter(prefix="/weather", tags=["Weather"])
 
 @router.get("/current")
-def current_weather(
+async def current_weather(
     lat: float = Query(...),
     lon: float = Query(...)
 ):
-    return get_current_weather(lat, lon)
+    return await get_current_weather_async(lat, lon)
@@ -1,13 +1,15 @@
-import json
 import os
 import threading
 from pathlib import Path
 from datetime import datetime
+from typing import List
+
+import orjson
 
 BASE_DIR = Path(__file__).resolve().parent.parent  
 DATA_DIR = BASE_DIR / "data"
-LOG_PATH = DATA_DIR / "query_log.json"
-TMP_PATH = DATA_DIR / "query_log_tmp.json"
+LOG_PATH = DATA_DIR / "query_log.jsonl"
+ARCHIVE_PATH = DATA_DIR / "query_log.archive.jsonl"
 
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -28,49 +30,46 @@ def _sanitize_entry(entry: dict) -> dict:
     return clean
 
 
-def _atomic_write(data: list):
+def _rotate_if_needed():
     """
-    Safely writes to a temporary file, then atomically replaces the log.
+    Moves the log aside once it outgrows the size limit, without reading it.
     """
-    with open(TMP_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
-    os.replace(TMP_PATH, LOG_PATH)
+    try:
+        if LOG_PATH.stat().st_size > MAX_LOG_SIZE_BYTES:
+            os.replace(LOG_PATH, ARCHIVE_PATH)
+    except FileNotFoundError:
+        pass
 
 
 def log_interaction(entry: dict):
     """
-    Append a single query/response record to query_log.json.
+    Append a single query/response record to query_log.jsonl.
     """
+    log_interactions_bulk([entry])
 
-    clean_entry = _sanitize_entry(entry)
-    clean_entry.setdefault("timestamp", datetime.utcnow().isoformat())
 
-    with _log_lock:
+def log_interactions_bulk(entries: List[dict]):
+    """
+    Append several records as JSON lines with a single write.
+    """
 
-        try:
-            if LOG_PATH.exists():
-                with open(LOG_PATH, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
-                if not isinstance(logs, list):
-                    logs = []
-            else:
-                logs = []
-        except Exception:
-            logs = []
-
-        logs.append(clean_entry)
+    if not entries:
+        return
 
-        try:
-            approx_new_size = len(json.dumps(logs).encode("utf-8"))
-        except Exception:
-            approx_new_size = 0
+    clean_entries = []
+    for entry in entries:
+        clean_entry = _sanitize_entry(entry)
+        clean_entry.setdefault("timestamp", datetime.utcnow().isoformat())
+        clean_entries.append(clean_entry)
 
-        if approx_new_size > MAX_LOG_SIZE_BYTES:
-            archive_path = LOG_PATH.with_suffix(".archive.json")
-            os.replace(LOG_PATH, archive_path)
-            logs = [clean_entry]  # start fresh after rotation
+    payload = b"".join(orjson.dumps(entry) + b"\n" for entry in clean_entries)
 
+    with _log_lock:
         try:
-            _atomic_write(logs)
+            _rotate_if_needed()
+            with open(LOG_PATH, "ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
         except Exception as e:
             print(f"[LOG ERROR] Failed to write log: {e}")
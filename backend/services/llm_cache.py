@@ -0,0 +1,141 @@
+from __future__ import annotations
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+CACHE_MAX_SIZE = 2048
+CACHE_TTL_SECONDS = 3600
+
+
+class LLMCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL.
+    Used to skip Groq round-trips for repeated prompts.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+llm_cache = LLMCache()
+
+
+def make_key(*parts: Any) -> str:
+    """Hash text/bytes parts into a fixed-size cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            digest.update(part)
+        else:
+            digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def cached_llm(
+    key_fn: Callable[..., str],
+    skip_values: Iterable[str] = (),
+    cache: LLMCache = llm_cache,
+):
+    """
+    Cache successful string responses of an LLM call.
+
+    key_fn receives the call arguments and returns the cache key. For
+    coroutine functions it may itself be async, so expensive keys can be
+    computed off the event loop.
+    Responses listed in skip_values (transient failures) are never stored.
+    Pass use_cache=False to bypass the cache for a single call.
+    """
+    skip = frozenset(skip_values)
+
+    def lookup(args, kwargs):
+        try:
+            key = key_fn(*args, **kwargs)
+        except Exception:
+            return None, None
+        return key, cache.get(key)
+
+    async def alookup(args, kwargs):
+        if not asyncio.iscoroutinefunction(key_fn):
+            return lookup(args, kwargs)
+        try:
+            key = await key_fn(*args, **kwargs)
+        except Exception:
+            return None, None
+        return key, cache.get(key)
+
+    def store(key, result):
+        if key is not None and isinstance(result, str) and result and result not in skip:
+            cache.set(key, result)
+
+    def decorator(func):
+
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, use_cache: bool = True, **kwargs):
+                if not use_cache:
+                    return await func(*args, **kwargs)
+
+                key, cached = await alookup(args, kwargs)
+                if cached is not None:
+                    return cached
+
+                result = await func(*args, **kwargs)
+                store(key, result)
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, use_cache: bool = True, **kwargs):
+            if not use_cache:
+                return func(*args, **kwargs)
+
+            key, cached = lookup(args, kwargs)
+            if cached is not None:
+                return cached
+
+            result = func(*args, **kwargs)
+            store(key, result)
+            return result
+
+        return wrapper
+
+    return decorator
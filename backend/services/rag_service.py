@@ -1,24 +1,163 @@
-import json
+import asyncio
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
 from typing import List, Dict
 import unicodedata
 import re
 
+import faiss
+import numpy as np
+import orjson
+
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 
 DATA_PATH = os.path.join(os.path.dirname(__file__), "../data/subsidies.json")
 VECTOR_DB_PATH = os.path.join(os.path.dirname(__file__), "../data/faiss_index")
+INDEX_FILE = os.path.join(VECTOR_DB_PATH, "index.faiss")
+
+# Flat-code indexes are mapped read-only so forked workers share one copy
+# of the vectors through the page cache
+_MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+RERANKER_MODEL_NAME = "BAAI/bge-reranker-base"
+
+# Hits farther than this L2 distance are not relevant enough to use
+MAX_RETRIEVAL_DISTANCE = 0.7
+
+# Concurrent query embeddings are coalesced into one encode call
+EMBED_BATCH_WINDOW_SECONDS = 0.01
+EMBED_BATCH_MAX = 32
 
 # Query cleaning
+_CTRL_TABLE = str.maketrans({**{c: " " for c in range(0x20)}, 0x7F: " "})
+_WS_RE = re.compile(r"\s+")
+
+
 def _clean_query(text: str) -> str:
     if not isinstance(text, str):
         return ""
-    text = unicodedata.normalize("NFKC", text)
-    text = re.sub(r"[\x00-\x1f\x7f]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip().lower()
+    text = unicodedata.normalize("NFKC", text).translate(_CTRL_TABLE)
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+# Text of one scheme, as indexed and as scored by the reranker
+_DOC_TEMPLATE = (
+    "Scheme: {scheme_name}\n"
+    "Eligibility: {eligibility}\n"
+    "Benefits: {benefits}\n"
+    "Notes: {notes}\n"
+)
+
+
+def _boost_query(query: str) -> str:
+    #  Context-boosting for subsidy domain
+    return _clean_query(query.strip() + " india agriculture subsidy")
+
+
+def _to_results(docs_with_scores) -> List[Dict[str, str]]:
+    results: List[Dict[str, str]] = []
+
+    for doc, score in docs_with_scores:
+        #  Distance threshold 
+        if score > MAX_RETRIEVAL_DISTANCE:
+            continue
+
+        meta = doc.metadata if isinstance(doc.metadata, dict) else {}
+
+        results.append({
+            "scheme_name": str(meta.get("scheme_name", "Unknown Scheme")),
+            "eligibility": str(meta.get("eligibility", "Not Provided")),
+            "benefits": str(meta.get("benefits", "Not Provided")),
+            "application_steps": str(meta.get("application_steps", "")),
+            "documents": str(meta.get("documents", "")),
+            "notes": str(meta.get("notes", "")),
+        })
+
+    return results
+
+
+def _doc_text(doc: Dict[str, str]) -> str:
+    return _DOC_TEMPLATE.format(
+        scheme_name=doc.get("scheme_name", ""),
+        eligibility=doc.get("eligibility", ""),
+        benefits=doc.get("benefits", ""),
+        notes=doc.get("notes", ""),
+    )
+
+
+def _to_fp16_index(index):
+    """
+    Re-encode a flat L2 index with fp16 vectors, halving its size and
+    scan bandwidth while keeping L2 distances for the score threshold.
+    """
+    if not isinstance(index, faiss.IndexFlatL2) or not index.ntotal:
+        return index
+
+    vectors = index.reconstruct_n(0, index.ntotal)
+    compact = faiss.IndexScalarQuantizer(
+        index.d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2
+    )
+    compact.train(vectors)
+    compact.add(vectors)
+    return compact
+
+
+class _EmbeddingBatcher:
+    """
+    Collects embedding requests from concurrent callers for a short window
+    and encodes them in a single batch on a background thread.
+    """
+
+    def __init__(self, embeddings):
+        self._embeddings = embeddings
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(
+                        target=self._run, name="rag-embed-batcher", daemon=True
+                    )
+                    self._worker.start()
+
+        future: Future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> List[float]:
+        return self.submit(text).result()
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + EMBED_BATCH_WINDOW_SECONDS
+
+            while len(items) < EMBED_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                vectors = self._embeddings.embed_documents([text for text, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(items, vectors):
+                future.set_result(vector)
 
 
 class RAG:
@@ -38,9 +177,15 @@ class RAG:
         self.embeddings = HuggingFaceEmbeddings(
             model_name="sentence-transformers/all-MiniLM-L12-v2"
         )
+        self._embed_batcher = _EmbeddingBatcher(self.embeddings)
 
         self.vector_store = None
 
+        # Cross-encoder is loaded on first rerank
+        self.reranker = None
+        self._reranker_failed = False
+        self._reranker_lock = threading.Lock()
+
         if os.path.exists(VECTOR_DB_PATH):
             try:
                 print("[RAG] Loading existing FAISS index...")
@@ -49,6 +194,10 @@ class RAG:
                     self.embeddings,
                     allow_dangerous_deserialization=True,
                 )
+                # Indexes saved before fp16 storage are converted on load
+                self.vector_store.index = _to_fp16_index(
+                    faiss.read_index(INDEX_FILE, _MMAP_FLAGS)
+                )
                 print("[RAG] FAISS index loaded.")
                 return
             except Exception as e:
@@ -65,8 +214,8 @@ class RAG:
             print(f"[RAG] subsidies.json not found at: {DATA_PATH}")
             return
 
-        with open(DATA_PATH, "r", encoding="utf-8") as f:
-            raw_data = json.load(f)
+        with open(DATA_PATH, "rb") as f:
+            raw_data = orjson.loads(f.read())
 
         documents: List[Document] = []
 
@@ -76,17 +225,18 @@ class RAG:
             benefits = item.get("benefits", "Not Provided")
             notes = item.get("notes", "")
 
-            content = (
-                f"Scheme: {scheme_name}\n"
-                f"Eligibility: {eligibility}\n"
-                f"Benefits: {benefits}\n"
-                f"Notes: {notes}\n"
+            content = _DOC_TEMPLATE.format(
+                scheme_name=scheme_name,
+                eligibility=eligibility,
+                benefits=benefits,
+                notes=notes,
             )
 
             documents.append(Document(page_content=content, metadata=item))
 
         print("[RAG] Building FAISS index...")
         self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        self.vector_store.index = _to_fp16_index(self.vector_store.index)
         self.vector_store.save_local(VECTOR_DB_PATH)
         print("[RAG] FAISS index built and saved.")
 
@@ -95,39 +245,160 @@ class RAG:
         if not query or not query.strip():
             return []
 
-        #  Context-boosting for subsidy domain
-        query_clean = _clean_query(query.strip() + " india agriculture subsidy")
+        query_clean = _boost_query(query)
 
         if not self.vector_store:
             print("[RAG] Vector store not loaded.")
             return []
 
         try:
-            docs_with_scores = self.vector_store.similarity_search_with_score(
-                query_clean, k=k
+            docs_with_scores = self.vector_store.similarity_search_with_score_by_vector(
+                self.embed_query(query_clean), k=k
             )
         except Exception as e:
             print(f"[RAG] Retrieval error: {e}")
             return []
 
-        results: List[Dict[str, str]] = []
+        return _to_results(docs_with_scores)
 
-        for doc, score in docs_with_scores:
-            #  Distance threshold 
-            if score > 0.7:
-                continue
+    async def aretrieve(self, query: str, k: int = 2) -> List[Dict[str, str]]:
+        """
+        Async retrieve; the query joins the embedding batch without
+        holding a worker thread while the batch window is open.
+        """
+
+        if not query or not query.strip():
+            return []
 
-            meta = doc.metadata if isinstance(doc.metadata, dict) else {}
+        if not self.vector_store:
+            print("[RAG] Vector store not loaded.")
+            return []
+
+        try:
+            vector = await self.aembed_query(_boost_query(query))
+            docs_with_scores = self.vector_store.similarity_search_with_score_by_vector(
+                vector, k=k
+            )
+        except Exception as e:
+            print(f"[RAG] Retrieval error: {e}")
+            return []
+
+        return _to_results(docs_with_scores)
+
+    def retrieve_batch(self, queries: List[str], k: int = 2) -> List[List[Dict[str, str]]]:
+        """
+        Retrieve for several queries with one embedding batch and a single
+        FAISS search over all query vectors. Results follow query order.
+        """
+
+        results: List[List[Dict[str, str]]] = [[] for _ in queries]
+        live = [i for i, query in enumerate(queries) if query and query.strip()]
 
-            results.append({
-                "scheme_name": str(meta.get("scheme_name", "Unknown Scheme")),
-                "eligibility": str(meta.get("eligibility", "Not Provided")),
-                "benefits": str(meta.get("benefits", "Not Provided")),
-                "application_steps": str(meta.get("application_steps", "")),
-                "documents": str(meta.get("documents", "")),
-                "notes": str(meta.get("notes", "")),
-            })
+        if not live:
+            return results
+
+        if not self.vector_store:
+            print("[RAG] Vector store not loaded.")
+            return results
+
+        store = self.vector_store
+
+        try:
+            vectors = np.asarray(
+                self.embeddings.embed_documents([_boost_query(queries[i]) for i in live]),
+                dtype=np.float32,
+            )
+            distances, indices = store.index.search(vectors, k)
+        except Exception as e:
+            print(f"[RAG] Retrieval error: {e}")
+            return results
+
+        for row, i in enumerate(live):
+            results[i] = _to_results(
+                (store.docstore.search(store.index_to_docstore_id[j]), float(distance))
+                for j, distance in zip(indices[row], distances[row])
+                if j != -1
+            )
 
         return results
 
-rag_service = RAG()
+    def warmup(self) -> None:
+        """
+        Run one embedding and one index search, and load the reranker,
+        so the first real query doesn't pay those costs.
+        """
+        if self.vector_store:
+            try:
+                self.vector_store.similarity_search_with_score_by_vector(
+                    self.embed_query("warmup"), k=1
+                )
+            except Exception as e:
+                print(f"[RAG] Warmup failed: {e}")
+
+        self._get_reranker()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed one query, batched with any concurrent callers."""
+        return self._embed_batcher.embed(text)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.wrap_future(self._embed_batcher.submit(text))
+
+    def _get_reranker(self):
+        if self.reranker is not None or self._reranker_failed:
+            return self.reranker
+
+        with self._reranker_lock:
+            if self.reranker is None and not self._reranker_failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self.reranker = CrossEncoder(RERANKER_MODEL_NAME)
+                except Exception as e:
+                    print(f"[RAG] Reranker unavailable: {e}")
+                    self._reranker_failed = True
+
+        return self.reranker
+
+    def rerank(
+        self,
+        query: str,
+        docs: List[Dict[str, str]],
+        top_n: int = 5,
+    ) -> List[Dict[str, str]]:
+        """
+        Keep the top_n docs by cross-encoder relevance, ordered so the most
+        relevant doc comes last (closest to the question in the prompt).
+        Each kept doc gains a "relevance" score in [0, 1].
+        Falls back to retrieval order if the reranker can't be used.
+        """
+
+        if not docs:
+            return docs
+
+        reranker = self._get_reranker()
+        if reranker is None:
+            return docs[:top_n]
+
+        try:
+            scores = reranker.predict(
+                [(query, _doc_text(doc)) for doc in docs],
+                batch_size=32,
+            )
+        except Exception as e:
+            print(f"[RAG] Rerank error: {e}")
+            return docs[:top_n]
+
+        ranked = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+        return [
+            {**docs[i], "relevance": float(scores[i])}
+            for i in reversed(ranked[:top_n])
+        ]
+
+
+@lru_cache(maxsize=1)
+def get_rag() -> RAG:
+    """
+    Return the shared RAG service, loading the models and index on first
+    use so processes that never retrieve don't pay for them.
+    """
+    return RAG()
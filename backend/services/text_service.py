@@ -1,13 +1,34 @@
 from __future__ import annotations
+import asyncio
 import time
-from typing import Optional
+from typing import Any, List, Optional, Tuple
 
-from backend.core.llm_client import get_llm
+import groq
+import httpx
+
+from backend.core.config import settings
+from backend.core.llm_client import (
+    RETRY_BACKOFF_BASE_SECONDS,
+    get_llm,
+    reset_llm,
+    retry_delay,
+)
+from backend.services.llm_cache import cached_llm, llm_cache, make_key
 
 MAX_RETRIES = 3
-RETRY_BACKOFF = (1, 2, 4)
 MAX_PROMPT_CHARS = 4000
 
+DEFAULT_SYSTEM_MSG = (
+    "You are AgriGPT, a domain-expert agricultural assistant. "
+    "Follow instructions strictly. "
+    "Do not add information unless explicitly asked. "
+    "Be factual, concise, and safety-aware."
+)
+
+EMPTY_RESPONSE_MSG = "I could not generate a response at this moment. Please try again."
+UNAVAILABLE_MSG = "The system is temporarily unavailable. Please try again later."
+
+
 def _normalize_output(output: Optional[str]) -> str:
     """Normalize model output safely into plain text."""
     if output is None:
@@ -20,38 +41,67 @@ def _normalize_output(output: Optional[str]) -> str:
         return ""
 
 
+# Transient failures worth retrying after a backoff
+_RETRYABLE_ERRORS = (
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+    groq.APITimeoutError,
+    groq.RateLimitError,
+    groq.InternalServerError,
+)
+_RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
 def _is_retryable_error(error: Exception) -> bool:
     """Detect network errors that should be retried."""
-    msg = str(error).lower()
-    return any(
-        token in msg
-        for token in (
-            "429",
-            "rate limit",
-            "too many requests",
-            "timeout",
-            "timed out",
-            "connection reset",
-            "connection aborted",
-            "service unavailable",
-            "gateway timeout",
-            "internal server error",
-            "500",
-            "502",
-            "503",
-            "504",
+    if isinstance(error, _RETRYABLE_ERRORS):
+        return True
+
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status in _RETRYABLE_STATUS_CODES
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """Detect a broken client connection that a fresh client may fix."""
+    # APITimeoutError subclasses APIConnectionError, but a timeout means a
+    # slow upstream that needs a backoff, not an immediate reconnect
+    if isinstance(error, (httpx.TimeoutException, groq.APITimeoutError)):
+        return False
+    return isinstance(error, (httpx.ConnectError, groq.APIConnectionError))
+
+
+def _truncate_prompt(prompt: str) -> str:
+    """Cap prompt length before it is sent to the model."""
+    if len(prompt) > MAX_PROMPT_CHARS:
+        return (
+            prompt[:MAX_PROMPT_CHARS]
+            + f"\n[Input truncated to {MAX_PROMPT_CHARS} characters]"
         )
-    )
+    return prompt
+
+
+def _build_messages(prompt: str, system_msg: str) -> List[dict]:
+    return [
+        {"role": "system", "content": system_msg},
+        {"role": "user", "content": prompt},
+    ]
+
 
+def _text_cache_key(prompt: str, system_msg: str = DEFAULT_SYSTEM_MSG) -> str:
+    # Model is part of the key so switching models never serves stale answers
+    return make_key("text", settings.TEXT_MODEL_NAME, system_msg, prompt)
 
+
+@cached_llm(
+    key_fn=_text_cache_key,
+    skip_values=(EMPTY_RESPONSE_MSG, UNAVAILABLE_MSG),
+)
 def query_groq_text(
     prompt: str,
-    system_msg: str = (
-        "You are AgriGPT, a domain-expert agricultural assistant. "
-        "Follow instructions strictly. "
-        "Do not add information unless explicitly asked. "
-        "Be factual, concise, and safety-aware."
-    ),
+    system_msg: str = DEFAULT_SYSTEM_MSG,
 ) -> str:
     """
     Primary text-generation entrypoint.
@@ -60,22 +110,14 @@ def query_groq_text(
     if not isinstance(prompt, str) or not prompt.strip():
         return "No valid input was provided."
 
-    if len(prompt) > MAX_PROMPT_CHARS:
-        prompt = (
-            prompt[:MAX_PROMPT_CHARS]
-            + f"\n[Input truncated to {MAX_PROMPT_CHARS} characters]"
-        )
+    prompt = _truncate_prompt(prompt)
 
     llm = get_llm()
+    delay = RETRY_BACKOFF_BASE_SECONDS
 
     for attempt in range(MAX_RETRIES):
         try:
-            response = llm.invoke(
-                [
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": prompt},
-                ]
-            )
+            response = llm.invoke(_build_messages(prompt, system_msg))
 
             content = getattr(response, "content", None)
             cleaned = _normalize_output(content)
@@ -83,11 +125,188 @@ def query_groq_text(
             if cleaned:
                 return cleaned
 
-            return "I could not generate a response at this moment. Please try again."
+            return EMPTY_RESPONSE_MSG
+
+        except Exception as e:
+            if attempt < MAX_RETRIES - 1 and _is_connection_error(e):
+                reset_llm()
+                llm = get_llm()
+                continue
+
+            if attempt < MAX_RETRIES - 1 and _is_retryable_error(e):
+                delay = retry_delay(delay, e)
+                time.sleep(delay)
+                continue
+
+            return UNAVAILABLE_MSG
+
+
+@cached_llm(
+    key_fn=_text_cache_key,
+    skip_values=(EMPTY_RESPONSE_MSG, UNAVAILABLE_MSG),
+)
+async def aquery_groq_text(
+    prompt: str,
+    system_msg: str = DEFAULT_SYSTEM_MSG,
+) -> str:
+    """
+    Async variant of query_groq_text on the loop's pooled HTTP/2 client.
+    """
+
+    if not isinstance(prompt, str) or not prompt.strip():
+        return "No valid input was provided."
+
+    prompt = _truncate_prompt(prompt)
+
+    llm = get_llm()
+    delay = RETRY_BACKOFF_BASE_SECONDS
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = await llm.ainvoke(_build_messages(prompt, system_msg))
+
+            cleaned = _normalize_output(getattr(response, "content", None))
+
+            if cleaned:
+                return cleaned
+
+            return EMPTY_RESPONSE_MSG
 
         except Exception as e:
+            if attempt < MAX_RETRIES - 1 and _is_connection_error(e):
+                reset_llm()
+                llm = get_llm()
+                continue
+
             if attempt < MAX_RETRIES - 1 and _is_retryable_error(e):
-                time.sleep(RETRY_BACKOFF[attempt])
+                delay = retry_delay(delay, e)
+                await asyncio.sleep(delay)
                 continue
 
-            return "The system is temporarily unavailable. Please try again later."
+            return UNAVAILABLE_MSG
+
+
+def _split_cached(
+    prompts: List[str],
+    system_msg: str,
+) -> Tuple[List[str], List[int]]:
+    """
+    Fill results from the cache and return the indexes still to be sent.
+    """
+    results = ["No valid input was provided."] * len(prompts)
+    pending = []
+
+    for i, prompt in enumerate(prompts):
+        if not isinstance(prompt, str) or not prompt.strip():
+            continue
+
+        cached = llm_cache.get(_text_cache_key(prompt, system_msg))
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+
+    return results, pending
+
+
+def _apply_batch_responses(
+    prompts: List[str],
+    system_msg: str,
+    results: List[str],
+    pending: List[int],
+    responses: List[Any],
+) -> List[int]:
+    """
+    Store batch responses into results and return indexes that hit a
+    retryable error and should be resent individually.
+    """
+    retry = []
+
+    for i, response in zip(pending, responses):
+        if isinstance(response, Exception):
+            if _is_retryable_error(response) or _is_connection_error(response):
+                retry.append(i)
+            else:
+                results[i] = UNAVAILABLE_MSG
+            continue
+
+        cleaned = _normalize_output(getattr(response, "content", None))
+        if cleaned:
+            llm_cache.set(_text_cache_key(prompts[i], system_msg), cleaned)
+            results[i] = cleaned
+        else:
+            results[i] = EMPTY_RESPONSE_MSG
+
+    return retry
+
+
+def query_groq_text_batch(
+    prompts: List[str],
+    system_msg: str = DEFAULT_SYSTEM_MSG,
+) -> List[str]:
+    """
+    Submit several independent prompts as one batch over a shared client.
+    Results are returned in prompt order; cached prompts are not resent and
+    retryable failures fall back to query_groq_text for that prompt.
+    """
+
+    results, pending = _split_cached(prompts, system_msg)
+
+    if not pending:
+        return results
+
+    llm = get_llm()
+
+    try:
+        responses = llm.batch(
+            [
+                _build_messages(_truncate_prompt(prompts[i]), system_msg)
+                for i in pending
+            ],
+            return_exceptions=True,
+        )
+    except Exception as e:
+        responses = [e] * len(pending)
+
+    for i in _apply_batch_responses(prompts, system_msg, results, pending, responses):
+        results[i] = query_groq_text(prompts[i], system_msg)
+
+    return results
+
+
+async def aquery_groq_text_batch(
+    prompts: List[str],
+    system_msg: str = DEFAULT_SYSTEM_MSG,
+) -> List[str]:
+    """
+    Async variant of query_groq_text_batch; all prompts are multiplexed
+    over the loop's pooled HTTP/2 client.
+    """
+
+    results, pending = _split_cached(prompts, system_msg)
+
+    if not pending:
+        return results
+
+    llm = get_llm()
+
+    try:
+        responses = await llm.abatch(
+            [
+                _build_messages(_truncate_prompt(prompts[i]), system_msg)
+                for i in pending
+            ],
+            return_exceptions=True,
+        )
+    except Exception as e:
+        responses = [e] * len(pending)
+
+    retry = _apply_batch_responses(prompts, system_msg, results, pending, responses)
+    retried = await asyncio.gather(
+        *(aquery_groq_text(prompts[i], system_msg) for i in retry)
+    )
+
+    for i, output in zip(retry, retried):
+        results[i] = output
+
+    return results
@@ -1,65 +1,287 @@
 from __future__ import annotations
-import base64
+import asyncio
+import io
 import os
+import re
+import threading
 import time
-from typing import Any
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
 
-from groq import Groq
+import orjson
+from groq import AsyncGroq, Groq
 from backend.core.config import settings
+from backend.core.constants import IMAGE_SIGNATURES
+from backend.core.llm_client import (
+    RETRY_BACKOFF_BASE_SECONDS,
+    get_async_http_client,
+    get_http_client,
+    retry_delay,
+)
+from backend.services.llm_cache import LLMCache, cached_llm, make_key
+
+try:
+    # SIMD base64; several times faster than binascii on large images
+    from pybase64 import b64encode
+except ImportError:
+    from base64 import b64encode
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
 
 MAX_RETRIES = 3
-RETRY_BACKOFF = (1, 2, 4)
 MAX_IMAGE_BYTES = 8 * 1024 * 1024
 MAX_VISION_PROMPT_CHARS = 2000
 
-def _detect_mime(image_path: str) -> str:
-    try:
-        with open(image_path, "rb") as f:
-            header = f.read(10)
-    except Exception:
-        return "unknown"
+# The model resizes images itself, so large photos are shrunk to this long
+# edge and re-encoded as JPEG before upload; small files go as they are
+IMAGE_MAX_EDGE = 1024
+IMAGE_JPEG_QUALITY = 85
+IMAGE_DOWNSCALE_MIN_BYTES = 200 * 1024
 
-    if header.startswith(b"\x89PNG"):
-        return "image/png"
+# Vision answers keyed by image content and prompt; kept apart from the
+# text cache so text traffic can't evict them
+VISION_CACHE_MAX_SIZE = 512
+_vision_cache = LLMCache(maxsize=VISION_CACHE_MAX_SIZE)
 
-    if header.startswith(b"\xFF\xD8"):
-        return "image/jpeg"
+# With settings.VISION_BATCHING, queries sharing a prompt that arrive within
+# the window are sent as one multi-image request
+VISION_BATCH_WINDOW_SECONDS = 0.05
+VISION_BATCH_MAX = 4
 
-    return "unknown"
+# The same signatures as big-endian ints of their first four bytes, so a
+# header is matched with one or two dict lookups; three-byte signatures
+# are keyed with a zero low byte. Longer signatures (PNG) are confirmed
+# against the full bytes after the lookup
+_MIME_BY_MAGIC = {
+    int.from_bytes(signature[:4].ljust(4, b"\0"), "big"): mime
+    for mime, signature in IMAGE_SIGNATURES.items()
+}
 
+UNCLEAR_IMAGE_MSG = (
+    "The image could not be analyzed clearly. "
+    "Please upload a clearer image."
+)
+VISION_UNAVAILABLE_MSG = (
+    "The image could not be analyzed at this time. "
+    "Please try again later."
+)
 
-def _normalize_output(output: Any) -> str:
+VISION_SYSTEM_PROMPT = (
+    "You are AgriGPT Vision, a multimodal agricultural image "
+    "observation assistant.\n\n"
+    "Your task is to describe ONLY what is clearly visible in the image.\n\n"
+    "STRICT RULES:\n"
+    "- Do NOT guess pests, diseases, or causes\n"
+    "- Do NOT hallucinate unseen symptoms\n"
+    "- Do NOT infer crop stage or health unless clearly visible\n"
+    "- If uncertain, say so clearly\n\n"
+    "ALLOWED:\n"
+    "- Describe visible spots, discoloration, holes, insects, mold, wilting\n"
+    "- Mention blur, poor lighting, or unclear image quality\n\n"
+    "OUTPUT STYLE:\n"
+    "- Bullet points\n"
+    "- Simple, farmer-friendly language\n"
+    "- No technical jargon unless unavoidable"
+)
+
+_BATCH_INSTRUCTION = (
+    "\n\nYou are given {count} separate images from different farmers. "
+    "Describe each image independently, following the rules above. "
+    "Reply with ONLY a JSON array of {count} strings, one per image, "
+    "in the order the images were given."
+)
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+VISION_PARAMS = {
+    "max_tokens": 900,
+    "temperature": 0.3,
+    "top_p": 1.0,
+}
+
+
+# Keyed by (API key, connection pool), so a pool recycled by reset_llm()
+# gets a new client; built once even when first requests arrive together
+_vision_clients: Dict[Tuple[str, int], Groq] = {}
+_vision_clients_lock = threading.Lock()
+
+# SDK clients wrap a loop-bound connection pool, so keep one per loop,
+# along with the pool it was built on
+_async_vision_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Any, AsyncGroq]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_vision_client() -> Groq:
+    """Return the shared Groq vision client for the configured API key."""
+    http_client = get_http_client()
+    key = (settings.GROQ_API_KEY, id(http_client))
+    client = _vision_clients.get(key)
+    if client is None:
+        with _vision_clients_lock:
+            client = _vision_clients.get(key)
+            if client is None:
+                # Clients on a replaced pool are dropped with it
+                _vision_clients.clear()
+                client = Groq(api_key=key[0], timeout=30, http_client=http_client)
+                _vision_clients[key] = client
+    return client
+
+
+def get_async_vision_client() -> AsyncGroq:
+    """Return the running event loop's shared AsyncGroq vision client."""
+    loop = asyncio.get_running_loop()
+    http_client = get_async_http_client()
+
+    pool, client = _async_vision_clients.get(loop, (None, None))
+    if client is None or pool is not http_client:
+        client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            timeout=30,
+            http_client=http_client,
+        )
+        _async_vision_clients[loop] = (http_client, client)
+    return client
+
+
+def reset_vision_clients() -> None:
+    _vision_clients.clear()
+    _async_vision_clients.clear()
+
+
+def _detect_mime(header: bytes) -> str:
+    if len(header) < 4:
+        return "unknown"
+
+    magic = int.from_bytes(header[:4], "big")
+    mime = _MIME_BY_MAGIC.get(magic) or _MIME_BY_MAGIC.get(magic & 0xFFFFFF00)
+    if mime is None or not header.startswith(IMAGE_SIGNATURES[mime]):
+        return "unknown"
+    return mime
+
+
+def _normalize_leaf(output: Any) -> str:
     if output is None:
         return ""
     if isinstance(output, str):
         return output.strip()
-    if isinstance(output, list):
-        return "\n".join(_normalize_output(x) for x in output)
     if isinstance(output, dict):
         return "\n".join(f"{k}: {v}" for k, v in output.items())
     return str(output).strip()
 
 
-def query_groq_image(image_path: str, prompt: str) -> str:
+def _normalize_output(output: Any) -> str:
+    if not isinstance(output, list):
+        return _normalize_leaf(output)
 
-    if not image_path or not os.path.exists(image_path):
-        return "The image file was not found."
+    # Walk nested lists depth-first, collecting every leaf for one final
+    # join instead of joining again at each level
+    parts: List[str] = []
+    stack = [iter(output)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, list) and item:
+                stack.append(iter(item))
+                break
+            parts.append("" if isinstance(item, list) else _normalize_leaf(item))
+        else:
+            stack.pop()
 
-    if os.path.getsize(image_path) > MAX_IMAGE_BYTES:
-        return "The image is too large. Please upload an image under 8MB."
+    return "\n".join(parts)
+
+
+def _image_cache_key(image_bytes: bytes, prompt: str) -> str:
+    # Key on content rather than path, so a changed file is never stale
+    return make_key("image", settings.VISION_MODEL_NAME, image_bytes, prompt)
 
-    mime = _detect_mime(image_path)
-    if mime not in ("image/png", "image/jpeg"):
-        return "Unsupported image format. Please upload a PNG or JPG image."
+
+async def _aimage_cache_key(image_bytes: bytes, prompt: str) -> str:
+    # Hashing up to 8 MB would stall every other coroutine on the loop
+    return await asyncio.to_thread(_image_cache_key, image_bytes, prompt)
+
+
+def _read_image(image_path: Optional[str]) -> Tuple[Optional[str], bytes]:
+    """
+    Read the image file once per request, refusing oversized files
+    before loading them.
+    """
+    if not image_path:
+        return "The image file was not found.", b""
 
     try:
         with open(image_path, "rb") as f:
-            raw_bytes = f.read()
+            if os.fstat(f.fileno()).st_size > MAX_IMAGE_BYTES:
+                return "The image is too large. Please upload an image under 8MB.", b""
+            return None, f.read()
+    except FileNotFoundError:
+        return "The image file was not found.", b""
+    except Exception:
+        return "The image could not be read.", b""
+
+
+def _to_rgb(img: "Image.Image") -> "Image.Image":
+    """Flatten transparency onto white; JPEG has no alpha channel."""
+    if img.mode == "RGB":
+        return img
+
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        flat = Image.new("RGB", rgba.size, (255, 255, 255))
+        flat.paste(rgba, mask=rgba.getchannel("A"))
+        return flat
+
+    return img.convert("RGB")
+
+
+def _downscale(raw_bytes: bytes, mime: str) -> Tuple[bytes, str]:
+    """
+    Shrink an oversized image to IMAGE_MAX_EDGE and re-encode it as JPEG.
+    Returns the input unchanged when Pillow is missing, the file is small,
+    decoding fails or the result would not be smaller.
+    """
+    if Image is None or len(raw_bytes) <= IMAGE_DOWNSCALE_MIN_BYTES:
+        return raw_bytes, mime
+
+    try:
+        with Image.open(io.BytesIO(raw_bytes)) as img:
+            # Lets JPEG decode at a reduced scale instead of full size
+            img.draft("RGB", (IMAGE_MAX_EDGE, IMAGE_MAX_EDGE))
+
+            # The re-encoded JPEG carries no EXIF, so apply the camera's
+            # orientation to the pixels before it is lost
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((IMAGE_MAX_EDGE, IMAGE_MAX_EDGE))
+
+            buf = io.BytesIO()
+            _to_rgb(img).save(buf, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
     except Exception:
-        return "The image could not be read."
+        return raw_bytes, mime
+
+    if buf.tell() >= len(raw_bytes):
+        return raw_bytes, mime
+    return buf.getvalue(), "image/jpeg"
+
+
+def _prepare_messages(
+    raw_bytes: bytes,
+    prompt: str,
+) -> Tuple[Optional[str], List[dict]]:
+    """
+    Validate and encode the image.
+    Returns (error_message, messages); messages is empty on error.
+    """
 
     if not raw_bytes:
-        return "The image file appears to be empty."
+        return "The image file appears to be empty.", []
+
+    if len(raw_bytes) > MAX_IMAGE_BYTES:
+        return "The image is too large. Please upload an image under 8MB.", []
+
+    mime = _detect_mime(raw_bytes)
+    if mime not in ("image/png", "image/jpeg"):
+        return "Unsupported image format. Please upload a PNG or JPG image.", []
 
     if not isinstance(prompt, str):
         prompt = ""
@@ -67,70 +289,334 @@ def query_groq_image(image_path: str, prompt: str) -> str:
     if len(prompt) > MAX_VISION_PROMPT_CHARS:
         prompt = prompt[:MAX_VISION_PROMPT_CHARS] + " [Prompt truncated]"
 
-    image_b64 = base64.b64encode(raw_bytes).decode("utf-8")
-    image_url = f"data:{mime};base64,{image_b64}"
+    raw_bytes, mime = _downscale(raw_bytes, mime)
+
+    # Assemble the URL as bytes and decode once, skipping an intermediate
+    # base64 str the size of the image
+    image_url = (f"data:{mime};base64,".encode("ascii") + b64encode(raw_bytes)).decode("ascii")
 
-    client = Groq(
-        api_key=settings.GROQ_API_KEY,
-        timeout=30,
-    )
+    messages = [
+        {
+            "role": "system",
+            "content": VISION_SYSTEM_PROMPT,
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt.strip()},
+                {"type": "image_url", "image_url": {"url": image_url}},
+            ],
+        },
+    ]
+    return None, messages
+
+
+def _completion_text(completion: Any) -> str:
+    # A malformed completion is an unclear answer, not a reason to retry
+    try:
+        content = completion.choices[0].message.content
+    except (AttributeError, IndexError, TypeError):
+        content = None
+
+    result = _normalize_output(content)
+
+    if not result or len(result) < 5:
+        return UNCLEAR_IMAGE_MSG
+
+    return result
+
+
+def query_groq_image(
+    image_path: Optional[str],
+    prompt: str,
+    image_bytes: Optional[bytes] = None,
+    use_cache: bool = True,
+) -> str:
+    """
+    Analyze an image with the vision model. The image is taken from
+    image_bytes when given and read once from image_path otherwise.
+    """
+
+    if image_bytes is None:
+        error, image_bytes = _read_image(image_path)
+        if error:
+            return error
+
+    return _query_image(image_bytes, prompt, use_cache=use_cache)
+
+
+@cached_llm(
+    key_fn=_image_cache_key,
+    skip_values=(UNCLEAR_IMAGE_MSG, VISION_UNAVAILABLE_MSG),
+    cache=_vision_cache,
+)
+def _query_image(image_bytes: bytes, prompt: str) -> str:
+
+    error, messages = _prepare_messages(image_bytes, prompt)
+    if error:
+        return error
+
+    client = get_vision_client()
+
+    delay = RETRY_BACKOFF_BASE_SECONDS
 
     for attempt in range(MAX_RETRIES):
         try:
             completion = client.chat.completions.create(
                 model=settings.VISION_MODEL_NAME,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are AgriGPT Vision, a multimodal agricultural image "
-                            "observation assistant.\n\n"
-                            "Your task is to describe ONLY what is clearly visible in the image.\n\n"
-                            "STRICT RULES:\n"
-                            "- Do NOT guess pests, diseases, or causes\n"
-                            "- Do NOT hallucinate unseen symptoms\n"
-                            "- Do NOT infer crop stage or health unless clearly visible\n"
-                            "- If uncertain, say so clearly\n\n"
-                            "ALLOWED:\n"
-                            "- Describe visible spots, discoloration, holes, insects, mold, wilting\n"
-                            "- Mention blur, poor lighting, or unclear image quality\n\n"
-                            "OUTPUT STYLE:\n"
-                            "- Bullet points\n"
-                            "- Simple, farmer-friendly language\n"
-                            "- No technical jargon unless unavoidable"
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt.strip()},
-                            {"type": "image_url", "image_url": {"url": image_url}},
-                        ],
-                    },
-                ],
-                max_tokens=900,
-                temperature=0.3,
-                top_p=1.0,
+                messages=messages,
+                **VISION_PARAMS,
             )
 
-            result = _normalize_output(
-                completion.choices[0].message.content
-            )
+            return _completion_text(completion)
+
+        except Exception as e:
+            if attempt < MAX_RETRIES - 1:
+                delay = retry_delay(delay, e)
+                time.sleep(delay)
+                continue
+
+            return VISION_UNAVAILABLE_MSG
+
+
+async def aquery_groq_image(
+    image_path: Optional[str],
+    prompt: str,
+    image_bytes: Optional[bytes] = None,
+    use_cache: bool = True,
+) -> str:
+    """
+    Async variant of query_groq_image on the loop's pooled HTTP/2 client.
+    """
+
+    if image_bytes is None:
+        error, image_bytes = await asyncio.to_thread(_read_image, image_path)
+        if error:
+            return error
+
+    return await _aquery_image(image_bytes, prompt, use_cache=use_cache)
+
+
+@cached_llm(
+    key_fn=_aimage_cache_key,
+    skip_values=(UNCLEAR_IMAGE_MSG, VISION_UNAVAILABLE_MSG),
+    cache=_vision_cache,
+)
+async def _aquery_image(image_bytes: bytes, prompt: str) -> str:
+
+    # Validating and base64-encoding the image is blocking work
+    error, messages = await asyncio.to_thread(_prepare_messages, image_bytes, prompt)
+    if error:
+        return error
+
+    if settings.VISION_BATCHING:
+        return await _get_vision_batcher().submit(prompt, messages)
+
+    return await _asend(messages)
+
+
+class _VisionGate:
+    """
+    Caps in-flight vision calls at settings.VISION_MAX_CONCURRENCY and,
+    when settings.VISION_MAX_RPM is set, spaces their starts evenly so
+    bursts queue here instead of tripping Groq's rate limit.
+    Bound to the event loop it was created on.
+    """
 
-            if not result or len(result) < 5:
-                return (
-                    "The image could not be analyzed clearly. "
-                    "Please upload a clearer image."
+    def __init__(self):
+        self._semaphore = asyncio.Semaphore(max(1, settings.VISION_MAX_CONCURRENCY))
+        rpm = settings.VISION_MAX_RPM
+        self._interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next_start = 0.0
+
+    async def __aenter__(self) -> None:
+        await self._semaphore.acquire()
+        if not self._interval:
+            return
+
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start)
+        self._next_start = start + self._interval
+        if start > now:
+            try:
+                await asyncio.sleep(start - now)
+            except BaseException:
+                self._semaphore.release()
+                raise
+
+    async def __aexit__(self, *exc) -> None:
+        self._semaphore.release()
+
+
+_vision_gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _VisionGate]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_vision_gate() -> _VisionGate:
+    loop = asyncio.get_running_loop()
+
+    gate = _vision_gates.get(loop)
+    if gate is None:
+        gate = _VisionGate()
+        _vision_gates[loop] = gate
+    return gate
+
+
+async def _asend(messages: List[dict]) -> str:
+    client = get_async_vision_client()
+
+    delay = RETRY_BACKOFF_BASE_SECONDS
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            async with _get_vision_gate():
+                completion = await client.chat.completions.create(
+                    model=settings.VISION_MODEL_NAME,
+                    messages=messages,
+                    **VISION_PARAMS,
                 )
 
-            return result
+            return _completion_text(completion)
 
         except Exception as e:
             if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_BACKOFF[attempt])
+                delay = retry_delay(delay, e)
+                await asyncio.sleep(delay)
                 continue
 
-            return (
-                "The image could not be analyzed at this time. "
-                "Please try again later."
+            return VISION_UNAVAILABLE_MSG
+
+
+async def _asend_batch(prompt: str, batch: List[List[dict]]) -> Optional[List[str]]:
+    """
+    Send several single-image requests that share a prompt as one
+    multi-image request. Returns None if the reply can't be split into
+    one usable answer per image, so callers fall back to single requests.
+    """
+
+    content = [{
+        "type": "text",
+        "text": prompt.strip() + _BATCH_INSTRUCTION.format(count=len(batch)),
+    }]
+    # The image part sits after the prompt in each prepared user message
+    content.extend(messages[1]["content"][1] for messages in batch)
+
+    params = dict(VISION_PARAMS, max_tokens=VISION_PARAMS["max_tokens"] * len(batch))
+
+    try:
+        async with _get_vision_gate():
+            completion = await get_async_vision_client().chat.completions.create(
+                model=settings.VISION_MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": VISION_SYSTEM_PROMPT},
+                    {"role": "user", "content": content},
+                ],
+                **params,
             )
+        match = _JSON_ARRAY_RE.search(completion.choices[0].message.content or "")
+        parsed = orjson.loads(match.group()) if match else None
+    except Exception:
+        return None
+
+    if not isinstance(parsed, list) or len(parsed) != len(batch):
+        return None
+
+    results = [_normalize_output(item) for item in parsed]
+    if any(len(result) < 5 for result in results):
+        return None
+
+    return results
+
+
+class _VisionBatcher:
+    """
+    Collects image queries for VISION_BATCH_WINDOW_SECONDS and sends
+    those sharing a prompt as one multi-image request.
+    Bound to the event loop it was created on.
+    """
+
+    def __init__(self):
+        self._queue: "asyncio.Queue[tuple]" = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    async def submit(self, prompt: str, messages: List[dict]) -> str:
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((prompt, messages, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + VISION_BATCH_WINDOW_SECONDS
+
+            while len(items) < VISION_BATCH_MAX:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            groups: Dict[str, List[tuple]] = {}
+            for item in items:
+                groups.setdefault(item[0], []).append(item)
+
+            # Dispatch without blocking the next collection window
+            for group in groups.values():
+                task = asyncio.create_task(self._dispatch(group))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, group: List[tuple]) -> None:
+        try:
+            results = None
+            if len(group) > 1:
+                results = await _asend_batch(group[0][0], [messages for _, messages, _ in group])
+            if results is None:
+                results = await asyncio.gather(
+                    *(_asend(messages) for _, messages, _ in group)
+                )
+        except Exception as e:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+
+_vision_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _VisionBatcher]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_vision_batcher() -> _VisionBatcher:
+    loop = asyncio.get_running_loop()
+
+    batcher = _vision_batchers.get(loop)
+    if batcher is None:
+        batcher = _VisionBatcher()
+        _vision_batchers[loop] = batcher
+    return batcher
+
+
+async def aquery_groq_image_many(
+    items: List[Tuple[Optional[str], str, Optional[bytes]]],
+) -> List[str]:
+    """
+    Analyze several images concurrently over the loop's shared client;
+    the vision gate bounds how many requests are in flight.
+    Each item is (image_path, prompt, image_bytes); results keep item order.
+    """
+
+    return list(await asyncio.gather(*(aquery_groq_image(*item) for item in items)))
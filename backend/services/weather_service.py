@@ -1,41 +1,138 @@
+from datetime import date
+
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from backend.core.config import settings
+from backend.core.llm_client import get_async_http_client
+from backend.services.llm_cache import LLMCache
 
 OPENWEATHER_URL = "https://api.openweathermap.org/data/2.5/weather"
+WEATHER_TIMEOUT_SECONDS = 5
+
+# First matching keyword in OpenWeather's "main" field wins; the frontend
+# only knows sunny, cloudy and rainy
+CONDITION_LABELS = (
+    ("rain", "rainy"),
+    ("cloud", "cloudy"),
+)
+
+# OpenWeather refreshes current conditions about every 10 minutes; nearby
+# points (~1 km, 2 decimals) share an entry and the date rolls it daily
+WEATHER_CACHE_TTL_SECONDS = 600
+_weather_cache = LLMCache(maxsize=1024, ttl=WEATHER_CACHE_TTL_SECONDS)
+
+# Last (ETag, weather) per point, kept past the TTL so a refresh can be a
+# conditional GET that comes back 304 with no body
+_weather_etags = LLMCache(maxsize=1024, ttl=24 * 3600)
+
+# Keep-alive session so repeat lookups skip the TCP/TLS handshake;
+# the adapter retries transient upstream failures
+_session = requests.Session()
+_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        ),
+    ),
+)
+
+
+def _lookup(lat: float, lon: float):
+    """Return (cache_key, cached weather, previous (ETag, weather) or None)."""
+    cache_key = (round(lat, 2), round(lon, 2), date.today())
+    return cache_key, _weather_cache.get(cache_key), _weather_etags.get(cache_key)
+
+
+def _request_args(lat: float, lon: float, previous) -> dict:
+    # Both requests and httpx ask for gzip and decode it transparently
+    return {
+        "params": {
+            "lat": lat,
+            "lon": lon,
+            "appid": settings.OPENWEATHER_API_KEY,
+            "units": "metric",
+        },
+        "headers": {"If-None-Match": previous[0]} if previous else None,
+        "timeout": WEATHER_TIMEOUT_SECONDS,
+    }
+
+
+def _parse_response(res, cache_key, previous) -> dict:
+    """Turn a requests/httpx response into the weather dict and cache it."""
+    if res.status_code == 304 and previous:
+        _weather_cache.set(cache_key, previous[1])
+        return dict(previous[1])
+
+    if res.status_code != 200:
+        return {"error": "Unable to fetch weather"}
+
+    data = orjson.loads(res.content)
+
+    condition_raw = data["weather"][0]["main"].lower()
+
+    condition = next(
+        (label for keyword, label in CONDITION_LABELS if keyword in condition_raw),
+        "sunny",
+    )
+
+    weather = {
+        "location": data.get("name", "Your Location"),
+        "temp": round(data["main"]["temp"]),
+        "humidity": data["main"]["humidity"],
+        "wind": round(data["wind"]["speed"] * 3.6), 
+        "condition": condition,
+    }
+    _weather_cache.set(cache_key, weather)
+
+    etag = res.headers.get("ETag")
+    if etag:
+        _weather_etags.set(cache_key, (etag, weather))
+    return dict(weather)
+
 
 def get_current_weather(lat: float, lon: float) -> dict:
+    """Blocking lookup for scripts and sync callers."""
     if not settings.OPENWEATHER_API_KEY:
         return {"error": "Weather service not configured"}
 
-    params = {
-        "lat": lat,
-        "lon": lon,
-        "appid": settings.OPENWEATHER_API_KEY,
-        "units": "metric",
-    }
+    cache_key, cached, previous = _lookup(lat, lon)
+    if cached is not None:
+        return dict(cached)
 
     try:
-        res = requests.get(OPENWEATHER_URL, params=params, timeout=5)
-        data = res.json()
+        res = _session.get(OPENWEATHER_URL, **_request_args(lat, lon, previous))
+        return _parse_response(res, cache_key, previous)
+
+    except Exception:
+        return {"error": "Weather API unavailable"}
 
-        if res.status_code != 200:
-            return {"error": "Unable to fetch weather"}
 
-        condition_raw = data["weather"][0]["main"].lower()
+async def get_current_weather_async(lat: float, lon: float) -> dict:
+    """
+    Non-blocking lookup over the loop's pooled HTTP/2 client, so concurrent
+    requests share one connection and no worker thread waits on OpenWeather.
+    """
+    if not settings.OPENWEATHER_API_KEY:
+        return {"error": "Weather service not configured"}
 
-        condition = (
-            "rainy" if "rain" in condition_raw else
-            "cloudy" if "cloud" in condition_raw else
-            "sunny"
-        )
+    cache_key, cached, previous = _lookup(lat, lon)
+    if cached is not None:
+        return dict(cached)
 
-        return {
-            "location": data.get("name", "Your Location"),
-            "temp": round(data["main"]["temp"]),
-            "humidity": data["main"]["humidity"],
-            "wind": round(data["wind"]["speed"] * 3.6), 
-            "condition": condition,
-        }
+    try:
+        res = await get_async_http_client().get(
+            OPENWEATHER_URL, **_request_args(lat, lon, previous)
+        )
+        return _parse_response(res, cache_key, previous)
 
     except Exception:
         return {"error": "Weather API unavailable"}
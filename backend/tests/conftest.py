@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from backend.agents import master_agent, subsidy_agent
+from backend.agents import formatter_agent
+from backend.core.response_cache import get_response_cache
+from backend.services import history_service, rag_service
+
+
+class FakeRag:
+    """Stands in for the embedding model; counts embedding calls."""
+
+    def __init__(self):
+        self.embed_calls = 0
+
+    def _vector(self, text: str) -> np.ndarray:
+        self.embed_calls += 1
+        seed = sum(map(ord, " ".join(text.lower().split())))
+        return np.random.default_rng(seed).random(32, dtype=np.float32)
+
+    def embed_query(self, text: str) -> np.ndarray:
+        return self._vector(text)
+
+    async def aembed_query(self, text: str) -> np.ndarray:
+        return self._vector(text)
+
+
+class FakeGroq:
+    """Records prompts sent to the text model and answers each one."""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def batch(self, prompts):
+        self.prompts.extend(prompts)
+        return [f"llm answer {len(self.prompts)}" for _ in prompts]
+
+    async def single(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return "formatted answer"
+
+
+@pytest.fixture
+def fake_rag(monkeypatch):
+    rag = FakeRag()
+    monkeypatch.setattr(rag_service, "get_rag", lambda: rag)
+    return rag
+
+
+@pytest.fixture
+def fake_groq(monkeypatch):
+    groq = FakeGroq()
+    monkeypatch.setattr(master_agent, "aquery_groq_text_batch", groq.batch)
+    monkeypatch.setattr(formatter_agent, "aquery_groq_text", groq.single)
+    return groq
+
+
+@pytest.fixture
+def route_to(monkeypatch):
+    """Make the router send every query to the given agent."""
+
+    def route(agent_name: str):
+        monkeypatch.setattr(
+            master_agent,
+            "llm_route_with_scores",
+            lambda *args: [{"agent": agent_name, "role": "primary", "score": 95}],
+        )
+
+    return route
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch, tmp_path):
+    monkeypatch.setattr(history_service, "LOG_PATH", tmp_path / "query_log.jsonl")
+    monkeypatch.setattr(history_service, "ARCHIVE_PATH", tmp_path / "query_log.archive.jsonl")
+    subsidy_agent._lookup_schemes.cache_clear()
+    for name in ("SubsidyAgent", "YieldAgent"):
+        get_response_cache(name).clear()
+    yield
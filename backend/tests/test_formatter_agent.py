@@ -0,0 +1,28 @@
+import asyncio
+
+from backend.agents import formatter_agent
+from backend.agents.formatter_agent import FormatterAgent
+
+PAYLOAD = {
+    "user_query": "Yellow leaves on tomato",
+    "routing_mode": "text_only",
+    "agent_results": [
+        {"agent": "IrrigationAgent", "role": "supporting", "content": "Check drainage."},
+        {"agent": "CropAgent", "role": "primary", "content": "Likely nitrogen deficiency."},
+    ],
+}
+
+
+async def _fail(*args, **kwargs):
+    raise RuntimeError("Groq unavailable")
+
+
+def test_failed_formatting_falls_back_to_ordered_blocks(monkeypatch):
+    monkeypatch.setattr(formatter_agent, "aquery_groq_text", _fail)
+
+    result = asyncio.run(FormatterAgent().ahandle_query(PAYLOAD))
+
+    assert result == (
+        "[PRIMARY | CropAgent]\nLikely nitrogen deficiency."
+        "\n\n[SUPPORTING | IrrigationAgent]\nCheck drainage."
+    )
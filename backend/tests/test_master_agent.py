@@ -0,0 +1,76 @@
+import asyncio
+
+from backend.agents import master_agent, subsidy_agent
+from backend.core.memory_manager import add_message_to_history
+from backend.core.response_cache import get_response_cache
+
+SCHEMES = (
+    {
+        "scheme_name": "PM-KISAN",
+        "eligibility": "Landholding farmer families",
+        "benefits": "Rs 6000 per year in three instalments",
+        "relevance": 0.5,
+    },
+)
+
+
+def _route(query, session_id=None):
+    return asyncio.run(master_agent.aroute_query(query=query, session_id=session_id))
+
+
+def _subsidy_prompts(groq):
+    return [p for p in groq.prompts if p.startswith("You are AgriGPT SubsidyAgent.")]
+
+
+def test_semantic_cache_serves_repeat_question(monkeypatch, fake_rag, fake_groq, route_to):
+    route_to("SubsidyAgent")
+    monkeypatch.setattr(subsidy_agent, "_lookup_schemes", lambda query: SCHEMES)
+
+    first = _route("PM Kisan eligibility")
+    assert fake_rag.embed_calls == 1
+    assert len(get_response_cache("SubsidyAgent")) == 1
+    assert len(_subsidy_prompts(fake_groq)) == 1
+
+    second = _route("pm kisan  eligibility")
+    assert second == first
+    assert len(_subsidy_prompts(fake_groq)) == 1
+
+
+def test_semantic_cache_hit_skips_retrieval(monkeypatch, fake_rag, fake_groq, route_to):
+    route_to("SubsidyAgent")
+    lookups = []
+    monkeypatch.setattr(
+        subsidy_agent, "_lookup_schemes", lambda query: lookups.append(query) or SCHEMES
+    )
+
+    _route("PM Kisan eligibility")
+    assert len(lookups) == 1
+
+    # The cache answers before build_prompt, so retrieval and rerank never run
+    _route("pm kisan  eligibility")
+    assert len(lookups) == 1
+
+
+def test_semantic_cache_skipped_for_follow_ups(monkeypatch, fake_rag, fake_groq, route_to):
+    route_to("SubsidyAgent")
+    monkeypatch.setattr(subsidy_agent, "_lookup_schemes", lambda query: SCHEMES)
+    add_message_to_history("farmer-1", "user", "Tell me about PM Kisan")
+
+    _route("What about its eligibility?", session_id="farmer-1")
+
+    assert fake_rag.embed_calls == 0
+    assert len(get_response_cache("SubsidyAgent")) == 0
+    assert "Tell me about PM Kisan" in _subsidy_prompts(fake_groq)[0]
+
+
+def test_confident_faq_match_skips_the_llm(monkeypatch, fake_rag, fake_groq, route_to):
+    route_to("SubsidyAgent")
+    faq_schemes = (dict(SCHEMES[0], relevance=0.99),)
+    monkeypatch.setattr(subsidy_agent, "_lookup_schemes", lambda query: faq_schemes)
+
+    _route("PM Kisan eligibility")
+
+    # Only the formatter calls the model, on the scheme record itself
+    assert _subsidy_prompts(fake_groq) == []
+    assert len(fake_groq.prompts) == 1
+    assert "PM-KISAN\nEligibility: Landholding farmer families" in fake_groq.prompts[0]
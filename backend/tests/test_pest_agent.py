@@ -0,0 +1,19 @@
+import asyncio
+
+from backend.agents import pest_agent
+from backend.agents.pest_agent import PestAgent
+
+
+async def _vision(*args, **kwargs):
+    return "Brown necrotic spots on the leaf margin."
+
+
+def test_in_memory_upload_is_logged_as_image(monkeypatch):
+    monkeypatch.setattr(pest_agent, "aquery_groq_image", _vision)
+    records = []
+    monkeypatch.setattr(PestAgent, "record", lambda self, **entry: records.append(entry))
+
+    asyncio.run(PestAgent().ahandle_query(image_bytes=b"\xff\xd8\xff\xe0"))
+
+    assert records[0]["query_type"] == "multimodal"
+    assert records[0]["image_path"] is None
@@ -0,0 +1,62 @@
+import groq
+import httpx
+
+from backend.core import llm_client
+from backend.services import text_service, vision_service
+
+
+class _Reply:
+    content = "Water the field at dawn."
+
+
+class _FlakyLLM:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        if self.calls == 1:
+            raise self.error
+        return _Reply()
+
+
+def _run_with(monkeypatch, error):
+    llm = _FlakyLLM(error)
+    resets, sleeps = [], []
+    monkeypatch.setattr(text_service, "get_llm", lambda: llm)
+    monkeypatch.setattr(text_service, "reset_llm", lambda: resets.append(True))
+    monkeypatch.setattr(text_service.time, "sleep", sleeps.append)
+
+    result = text_service.query_groq_text("When should I irrigate?", use_cache=False)
+    return result, resets, sleeps
+
+
+def test_timeouts_back_off_instead_of_reconnecting(monkeypatch):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+    result, resets, sleeps = _run_with(monkeypatch, groq.APITimeoutError(request=request))
+
+    assert result == "Water the field at dawn."
+    assert resets == []
+    assert len(sleeps) == 1 and sleeps[0] >= llm_client.RETRY_BACKOFF_BASE_SECONDS
+
+
+def test_connection_errors_reconnect_immediately(monkeypatch):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+    result, resets, sleeps = _run_with(monkeypatch, groq.APIConnectionError(request=request))
+
+    assert result == "Water the field at dawn."
+    assert resets == [True]
+    assert sleeps == []
+
+
+def test_reset_llm_recycles_the_connection_pool():
+    old_pool = llm_client.get_http_client()
+    old_vision = vision_service.get_vision_client()
+
+    llm_client.reset_llm()
+
+    assert llm_client.get_http_client() is not old_pool
+    assert vision_service.get_vision_client() is not old_vision
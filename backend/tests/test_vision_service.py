@@ -0,0 +1,124 @@
+import asyncio
+import io
+import threading
+
+import numpy as np
+import pytest
+
+from backend.services import vision_service
+
+Image = pytest.importorskip("PIL.Image")
+
+EXIF_ORIENTATION = 0x0112
+
+
+def _noise(size, mode="RGB"):
+    # Noise keeps the encoded file above the downscale threshold
+    channels = len(mode)
+    pixels = np.random.default_rng(0).integers(0, 256, (size[1], size[0], channels), dtype=np.uint8)
+    return Image.fromarray(pixels, mode)
+
+
+def test_downscale_applies_exif_rotation():
+    # A sideways phone shot: pixels stored landscape, EXIF says rotate 90 degrees
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    buf = io.BytesIO()
+    _noise((2000, 1000)).save(buf, "JPEG", quality=95, exif=exif.tobytes())
+
+    raw, mime = vision_service._downscale(buf.getvalue(), "image/jpeg")
+
+    assert mime == "image/jpeg"
+    with Image.open(io.BytesIO(raw)) as out:
+        assert out.size == (512, 1024)
+        assert out.getexif().get(EXIF_ORIENTATION) in (None, 1)
+
+
+def test_downscale_flattens_transparency_onto_white():
+    img = _noise((1600, 1200), "RGBA")
+    img.putalpha(0)
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+
+    raw, mime = vision_service._downscale(buf.getvalue(), "image/png")
+
+    assert mime == "image/jpeg"
+    with Image.open(io.BytesIO(raw)) as out:
+        assert out.mode == "RGB"
+        assert max(out.size) == vision_service.IMAGE_MAX_EDGE
+        assert out.getpixel((10, 10)) == (255, 255, 255)
+
+
+def test_downscale_keeps_small_images():
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buf, "PNG")
+
+    raw, mime = vision_service._downscale(buf.getvalue(), "image/png")
+
+    assert raw == buf.getvalue() and mime == "image/png"
+
+
+def test_detect_mime_checks_the_full_signature():
+    assert vision_service._detect_mime(b"\x89PNG\r\n\x1a\n" + bytes(8)) == "image/png"
+    assert vision_service._detect_mime(b"\xff\xd8\xff\xdb" + bytes(8)) == "image/jpeg"
+    # Only the first four bytes of the PNG signature match
+    assert vision_service._detect_mime(b"\x89PNG" + bytes(8)) == "unknown"
+    assert vision_service._detect_mime(b"\x89PNG") == "unknown"
+
+
+def test_path_callers_read_the_image_once(monkeypatch, tmp_path):
+    path = tmp_path / "leaf.png"
+    Image.new("RGB", (64, 64), (40, 160, 40)).save(path)
+    vision_service._vision_cache.clear()
+
+    reads, sent = [], []
+    real_read = vision_service._read_image
+
+    def counting_read(image_path):
+        reads.append(image_path)
+        return real_read(image_path)
+
+    async def fake_send(messages):
+        sent.append(messages)
+        return "Healthy leaf with no visible pests."
+
+    monkeypatch.setattr(vision_service, "_read_image", counting_read)
+    monkeypatch.setattr(vision_service, "_asend", fake_send)
+
+    async def ask_twice():
+        first = await vision_service.aquery_groq_image(str(path), "What is wrong?")
+        second = await vision_service.aquery_groq_image(str(path), "What is wrong?")
+        return first, second
+
+    first, second = asyncio.run(ask_twice())
+
+    assert first == second == "Healthy leaf with no visible pests."
+    assert len(reads) == 2
+    assert len(sent) == 1
+
+
+def test_async_cache_key_is_hashed_off_the_event_loop(monkeypatch):
+    vision_service._vision_cache.clear()
+    loop_threads = []
+    real_key = vision_service._image_cache_key
+
+    def recording_key(image_bytes, prompt):
+        loop_threads.append(threading.get_ident())
+        return real_key(image_bytes, prompt)
+
+    async def fake_send(messages):
+        return "Healthy leaf with no visible pests."
+
+    monkeypatch.setattr(vision_service, "_image_cache_key", recording_key)
+    monkeypatch.setattr(vision_service, "_asend", fake_send)
+
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buf, "PNG")
+
+    async def ask():
+        await vision_service.aquery_groq_image(None, "What is wrong?", buf.getvalue())
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(ask())
+
+    assert loop_threads and loop_thread not in loop_threads